@@ -17,7 +17,7 @@ from random import randrange
 
 # https://stackoverflow.com/questions/73143243/are-there-any-alternatives-for-the-python-module-randoms-shuffle-function-in
 def shuffle(array):
-    "FisherYates shuffle"
+    "Fisher–Yates shuffle"
     for i in range(len(array)-1, 0, -1):
         j = randrange(i+1)
         array[i], array[j] = array[j], array[i]
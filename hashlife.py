@@ -0,0 +1,257 @@
+# HashLife for fast-forwarding Life patterns
+#
+# The plane is a quadtree of canonical nodes: identical squares anywhere in
+# the pattern (and at any time) share one node, and each node remembers its
+# own future. That lets long synthesis patterns jump 2^k generations at once
+# before being handed back to Life as an ordinary dense grid.
+#
+# Coordinates are centred: a node of level L covers -2^(L-1) .. 2^(L-1)-1 on
+# both axes, and the root stays centred on the origin as it grows.
+
+from life_rules import DEFAULT_RULE, compile_rule
+
+MAX_NODES = 50000   # canonical nodes kept before the cache is collected
+
+
+class Node:
+    __slots__ = ('level', 'nw', 'ne', 'sw', 'se', 'population', 'results')
+
+    def __init__(self, level, nw, ne, sw, se, population):
+        self.level = level
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.population = population
+        self.results = None
+
+
+class HashLife:
+    def __init__(self, rule=DEFAULT_RULE, max_nodes=MAX_NODES):
+        self.table = compile_rule(rule)
+        if self.table[0]:
+            raise ValueError("HashLife can't run B0 rules on an empty plane")
+        # the table is collected whenever it grows past limit, which is
+        # max_nodes unless what's still in use after a collection needs more
+        self.max_nodes = max_nodes
+        self.limit = max_nodes
+
+        self.off = Node(0, None, None, None, None, 0)
+        self.on = Node(0, None, None, None, None, 1)
+        self.nodes = {}
+        self.empties = [self.off]
+
+        self.root = self.empty(3)
+        self.generation = 0
+
+    ### Canonical nodes
+    def join(self, nw, ne, sw, se):
+        key = (id(nw), id(ne), id(sw), id(se))
+        node = self.nodes.get(key)
+        if node is None:
+            population = nw.population + ne.population + sw.population + se.population
+            node = Node(nw.level+1, nw, ne, sw, se, population)
+            self.nodes[key] = node
+        return node
+
+    def empty(self, level):
+        while len(self.empties) <= level:
+            e = self.empties[-1]
+            self.empties.append(self.join(e, e, e, e))
+        return self.empties[level]
+
+    def collect(self):
+        # evict everything not reachable from the root (or an empty node);
+        # this can happen partway through a jump, when nodes the jump is
+        # still working on are evicted too, but they stay alive as long as
+        # it holds them and are just no longer shared
+        self.nodes = {}
+        seen = {}
+
+        def intern(node):
+            if node.level == 0:
+                return
+            if id(node) in seen:
+                return
+            seen[id(node)] = node
+            for child in (node.nw, node.ne, node.sw, node.se):
+                intern(child)
+            node.results = None
+            self.nodes[(id(node.nw), id(node.ne), id(node.sw), id(node.se))] = node
+
+        for e in self.empties:
+            intern(e)
+        intern(self.root)
+        self.limit = max(self.max_nodes, 2 * len(self.nodes))
+
+    ### Loading and reading
+    def load(self, grid, width, height):
+        # grid is the list-of-lists form used by Life, indexed grid[x][y]
+        cells = []
+        for x in range(width):
+            column = grid[x]
+            for y in range(height):
+                if column[y]:
+                    cells.append((x - width//2, y - height//2))
+        self.load_cells(cells)
+
+    def load_cells(self, cells):
+        level = 3
+        for x, y in cells:
+            while not (-(1 << (level-1)) <= x < (1 << (level-1)) and -(1 << (level-1)) <= y < (1 << (level-1))):
+                level += 1
+        self.root = self.build(level, -(1 << (level-1)), -(1 << (level-1)), cells)
+        self.generation = 0
+
+    def build(self, level, left, top, cells):
+        if not cells:
+            return self.empty(level)
+        if level == 0:
+            return self.on
+        half = 1 << (level-1)
+        quadrants = ([], [], [], [])
+        for x, y in cells:
+            quadrants[(x >= left+half) + 2*(y >= top+half)].append((x, y))
+        return self.join(
+            self.build(level-1, left, top, quadrants[0]),
+            self.build(level-1, left+half, top, quadrants[1]),
+            self.build(level-1, left, top+half, quadrants[2]),
+            self.build(level-1, left+half, top+half, quadrants[3]),
+        )
+
+    @property
+    def population(self):
+        return self.root.population
+
+    def window(self, width, height):
+        # dense grid[x][y] of the width x height window centred on the origin
+        grid = [[False for _ in range(height)] for _ in range(width)]
+        half = 1 << (self.root.level-1)
+        self.fill(grid, self.root, -half + width//2, -half + height//2, width, height)
+        return grid
+
+    def fill(self, grid, node, left, top, width, height):
+        size = 1 << node.level
+        if not node.population:
+            return
+        if left >= width or top >= height or left+size <= 0 or top+size <= 0:
+            return
+        if node.level == 0:
+            grid[left][top] = True
+            return
+        half = size >> 1
+        self.fill(grid, node.nw, left, top, width, height)
+        self.fill(grid, node.ne, left+half, top, width, height)
+        self.fill(grid, node.sw, left, top+half, width, height)
+        self.fill(grid, node.se, left+half, top+half, width, height)
+
+    ### Generations
+    def centre(self, node):
+        # the same pattern, one level up, with an empty border all round
+        e = self.empty(node.level-1)
+        return self.join(
+            self.join(e, e, e, node.nw),
+            self.join(e, e, node.ne, e),
+            self.join(e, node.sw, e, e),
+            self.join(node.se, e, e, e),
+        )
+
+    def padded(self, node):
+        # True if all live cells sit in the inner quarter of the node
+        return (
+            node.nw.population == node.nw.se.se.population and
+            node.ne.population == node.ne.sw.sw.population and
+            node.sw.population == node.sw.ne.ne.population and
+            node.se.population == node.se.nw.nw.population
+        )
+
+    def life_4x4(self, node):
+        # level 2 base case: the centre 2x2 after one generation
+        bits = 0
+        for i, quad in enumerate((node.nw, node.ne, node.sw, node.se)):
+            for j, leaf in enumerate((quad.nw, quad.ne, quad.sw, quad.se)):
+                if leaf.population:
+                    x = (i & 1) * 2 + (j & 1)
+                    y = (i >> 1) * 2 + (j >> 1)
+                    bits |= 1 << (y*4 + x)
+
+        centre = []
+        for x, y in ((1, 1), (2, 1), (1, 2), (2, 2)):
+            # the 3x3 neighbourhood around (x, y), as a mask for the rule table
+            above = (bits >> ((y-1)*4 + x-1)) & 7
+            row = (bits >> (y*4 + x-1)) & 7
+            below = (bits >> ((y+1)*4 + x-1)) & 7
+            centre.append(self.on if self.table[above | row << 3 | below << 6] else self.off)
+        return self.join(*centre)
+
+    def successor(self, node, j):
+        # centre of node (one level down) advanced 2^j generations, j <= level-2
+        if not node.population:
+            return node.nw
+        j = min(j, node.level-2)
+        if len(self.nodes) > self.limit:
+            self.collect()
+        if node.results is None:
+            node.results = {}
+        elif j in node.results:
+            return node.results[j]
+
+        if node.level == 2:
+            result = self.life_4x4(node)
+        else:
+            a, b, c, d = node.nw, node.ne, node.sw, node.se
+            join = self.join
+            succ = self.successor
+            c1 = succ(a, j)
+            c2 = succ(join(a.ne, b.nw, a.se, b.sw), j)
+            c3 = succ(b, j)
+            c4 = succ(join(a.sw, a.se, c.nw, c.ne), j)
+            c5 = succ(join(a.se, b.sw, c.ne, d.nw), j)
+            c6 = succ(join(b.sw, b.se, d.nw, d.ne), j)
+            c7 = succ(c, j)
+            c8 = succ(join(c.ne, d.nw, c.se, d.sw), j)
+            c9 = succ(d, j)
+
+            if j < node.level - 2:
+                result = join(
+                    join(c1.se, c2.sw, c4.ne, c5.nw),
+                    join(c2.se, c3.sw, c5.ne, c6.nw),
+                    join(c4.se, c5.sw, c7.ne, c8.nw),
+                    join(c5.se, c6.sw, c8.ne, c9.nw),
+                )
+            else:
+                result = join(
+                    succ(join(c1, c2, c4, c5), j),
+                    succ(join(c2, c3, c5, c6), j),
+                    succ(join(c4, c5, c7, c8), j),
+                    succ(join(c5, c6, c8, c9), j),
+                )
+
+        # a collection while working on it clears node's results
+        if node.results is None:
+            node.results = {}
+        node.results[j] = result
+        return result
+
+    def step(self, k):
+        # jump forward 2^k generations
+        if len(self.nodes) > self.limit:
+            self.collect()
+
+        root = self.root
+        while root.level < k+2 or not self.padded(root):
+            root = self.centre(root)
+        # one more level so the successor (half the size) keeps the whole pattern
+        root = self.centre(root)
+        self.root = self.successor(root, k)
+        self.generation += 1 << k
+
+    def advance(self, generations):
+        # jump forward any number of generations, largest powers of two first
+        k = 0
+        while generations >> k:
+            k += 1
+        while k:
+            k -= 1
+            if generations >> k & 1:
+                self.step(k)
@@ -0,0 +1,36 @@
+# MicroPython's time.ticks_* functions, added to the host's time module
+# when any of the host modules is imported
+
+import time
+
+_start = time.monotonic_ns()
+
+
+def ticks_ms():
+    return (time.monotonic_ns() - _start) // 1000000
+
+
+def ticks_us():
+    return (time.monotonic_ns() - _start) // 1000
+
+
+def ticks_diff(a, b):
+    return a - b
+
+
+def ticks_add(a, b):
+    return a + b
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    time.sleep(us / 1000000)
+
+
+def install():
+    for name in ('ticks_ms', 'ticks_us', 'ticks_diff', 'ticks_add', 'sleep_ms', 'sleep_us'):
+        if not hasattr(time, name):
+            setattr(time, name, globals()[name])
@@ -0,0 +1,35 @@
+# Host stand-in for MicroPython's network module: a WLAN that's always
+# connected, on the loopback interface
+
+import _host_time
+
+_host_time.install()
+
+STA_IF = 0
+AP_IF = 1
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._active = True
+
+    def active(self, active=None):
+        if active is None:
+            return self._active
+        self._active = active
+
+    def connect(self, ssid=None, key=None):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def isconnected(self):
+        return True
+
+    def status(self, param=None):
+        return 3    # STAT_GOT_IP
+
+    def ifconfig(self):
+        return ('127.0.0.1', '255.0.0.0', '127.0.0.1', '127.0.0.1')
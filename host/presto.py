@@ -0,0 +1,188 @@
+# Host stand-in for the Presto, so the scripts in this repo run on Linux:
+#
+#     PYTHONPATH=host python3 life.py
+#
+# The display is an in-memory RGB565 framebuffer (byte-swapped, as on the
+# Presto) which supports memoryview(). Every drawing call is counted in
+# display.counts, and every update in presto.counts, for comparing render
+# cost against everything else. Set PRESTO_DUMP to a directory to write
+# each frame there, as PNG or, with PRESTO_DUMP_FORMAT=raw, raw RGB565.
+
+import colorsys
+import os
+import struct
+import zlib
+
+import _host_time
+
+_host_time.install()
+
+
+def write_png(path, width, height, rgb):
+    # minimal RGB PNG writer
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    stride = width * 3
+    raw = b''.join([b'\x00' + rgb[y*stride:(y+1)*stride] for y in range(height)])
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw)))
+        f.write(chunk(b'IEND', b''))
+
+
+class PicoGraphics(bytearray):
+    # the framebuffer itself, with PicoGraphics' drawing methods
+    def __init__(self, width, height):
+        super().__init__(width * height * 2)
+        self.width = width
+        self.height = height
+        self.stride = width * 2
+        self.pen = b'\x00\x00'
+        self.counts = {}
+
+    def count(self, name):
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    ### Pens
+    def create_pen(self, r, g, b):
+        self.count('create_pen')
+        return ((r & 0b11111000) << 8) | ((g & 0b11111100) << 3) | (b >> 3)
+
+    def create_pen_hsv(self, h, s, v):
+        self.count('create_pen_hsv')
+        r, g, b = colorsys.hsv_to_rgb(h % 1.0, s, v)
+        return ((int(r*255) & 0b11111000) << 8) | ((int(g*255) & 0b11111100) << 3) | (int(b*255) >> 3)
+
+    def reset_pen(self, pen):
+        self.count('reset_pen')
+
+    def set_pen(self, pen):
+        self.count('set_pen')
+        self.pen = bytes((pen >> 8 & 0xff, pen & 0xff))
+
+    def set_layer(self, layer):
+        self.count('set_layer')
+
+    def get_bounds(self):
+        return (self.width, self.height)
+
+    ### Drawing
+    def span(self, x1, x2, y):
+        # fill x1..x2 inclusive on row y, clipped to the display
+        if not 0 <= y < self.height:
+            return
+        x1 = max(int(x1), 0)
+        x2 = min(int(x2), self.width - 1)
+        if x1 > x2:
+            return
+        start = y*self.stride + x1*2
+        self[start:start + (x2-x1+1)*2] = self.pen * (x2-x1+1)
+
+    def clear(self):
+        self.count('clear')
+        self[:] = self.pen * (self.width * self.height)
+
+    def pixel(self, x, y):
+        self.count('pixel')
+        self.span(x, x, int(y))
+
+    def rectangle(self, x, y, w, h):
+        self.count('rectangle')
+        for row in range(max(int(y), 0), min(int(y + h), self.height)):
+            self.span(x, x + w - 1, row)
+
+    def line(self, x1, y1, x2, y2, thickness=1):
+        self.count('line')
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        dx, dy = abs(x2 - x1), -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        error = dx + dy
+        while True:
+            self.span(x1, x1, y1)
+            if x1 == x2 and y1 == y2:
+                break
+            e2 = 2 * error
+            if e2 >= dy:
+                error += dy
+                x1 += sx
+            if e2 <= dx:
+                error += dx
+                y1 += sy
+
+    def circle(self, x, y, r):
+        self.count('circle')
+        for dy in range(-r, r + 1):
+            dx = int((r*r - dy*dy) ** 0.5)
+            self.span(x - dx, x + dx, int(y + dy))
+
+    def triangle(self, x1, y1, x2, y2, x3, y3):
+        self.count('triangle')
+        points = sorted([(y1, x1), (y2, x2), (y3, x3)])
+        (ya, xa), (yb, xb), (yc, xc) = points
+        for y in range(int(ya), int(yc) + 1):
+            # where the long edge and the current short edge cross this row
+            long_x = xa + (xc - xa) * (y - ya) / (yc - ya) if yc != ya else xa
+            if y < yb:
+                short_x = xa + (xb - xa) * (y - ya) / (yb - ya) if yb != ya else xa
+            else:
+                short_x = xb + (xc - xb) * (y - yb) / (yc - yb) if yc != yb else xb
+            self.span(min(long_x, short_x), max(long_x, short_x), y)
+
+    def text(self, text, x, y, wordwrap=None, scale=2, angle=0, spacing=1):
+        # no fonts here: counted, but not drawn
+        self.count('text')
+
+    ### Frame output
+    def rgb(self):
+        # the framebuffer as 8-bit RGB
+        rgb = bytearray(self.width * self.height * 3)
+        for i in range(self.width * self.height):
+            value = self[i*2] << 8 | self[i*2+1]
+            rgb[i*3] = (value >> 8) & 0b11111000
+            rgb[i*3+1] = (value >> 3) & 0b11111100
+            rgb[i*3+2] = (value << 3) & 0b11111000
+        return bytes(rgb)
+
+
+class Presto:
+    def __init__(self, full_res=False, ambient_light=False, direct_to_fb=False, layers=None):
+        size = 480 if full_res else 240
+        self.display = PicoGraphics(size, size)
+        self.backlight = 1.0
+        self.counts = {}
+        self.frame = 0
+        self.dump_dir = os.environ.get('PRESTO_DUMP')
+        self.dump_format = os.environ.get('PRESTO_DUMP_FORMAT', 'png')
+
+    def count(self, name):
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def update(self):
+        self.count('update')
+        self.dump()
+
+    def partial_update(self, x, y, w, h):
+        self.count('partial_update')
+        self.dump()
+
+    def set_backlight(self, brightness):
+        self.backlight = brightness
+
+    def connect(self, ssid=None, password=None):
+        self.count('connect')
+        return True
+
+    def dump(self):
+        self.frame += 1
+        if not self.dump_dir:
+            return
+        os.makedirs(self.dump_dir, exist_ok=True)
+        path = os.path.join(self.dump_dir, f'frame-{self.frame:06d}.{self.dump_format}')
+        if self.dump_format == 'raw':
+            with open(path, 'wb') as f:
+                f.write(self.display)
+        else:
+            write_png(path, self.display.width, self.display.height, self.display.rgb())
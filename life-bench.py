@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+#
+# runs on a computer to benchmark the Life engines, headless
+#
+# Every pattern in life-rles/ plus seeded soups, on several board sizes,
+# stepping with update_grid and handle_cycles as the app loop does. A run
+# stops once a cycle is confirmed, where the app would start counting down to
+# a reseed, so every generation timed is of the pattern named. Results go to a
+# JSON file so runs from different commits can be compared:
+#
+#     ./life-bench.py --sizes 80,160 --engines lists,bits -o before.json
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.join(HERE, 'host'))
+
+import life
+
+
+def patterns():
+    names = sorted(filename[:-4] for filename in os.listdir(os.path.join(HERE, 'life-rles')) if filename.endswith('.rle'))
+    return [('rle', name) for name in names] + [('soup', None), ('kaleidosoup', None)]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def run(board, kind, filename, generations, seed, measure_memory=False):
+    # up to generations generations, fewer if the pattern settles first
+    random.seed(seed)
+    board.setup(kind=kind, filename=filename)
+    board.countdown = 0
+
+    latencies = []
+    allocated = []
+    for _ in range(generations):
+        if measure_memory:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter_ns()
+
+        await board.update_grid()
+        if life.MAX_CYCLES:
+            await board.handle_cycles()
+
+        latencies.append(time.perf_counter_ns() - start)
+        if measure_memory:
+            # memory allocated on top of what was live before the generation
+            allocated.append(tracemalloc.get_traced_memory()[1] - before)
+        if board.countdown:
+            # settled; carrying on would time the countdown and reseed
+            break
+
+    return latencies, allocated
+
+
+async def benchmark(args):
+    results = []
+    for size in args.sizes:
+        for engine in args.engines:
+            life.WIDTH = life.HEIGHT = size
+            life.ENGINE = engine
+            board = life.Life()
+
+            for kind, filename in patterns():
+                if args.patterns and (filename or kind) not in args.patterns:
+                    continue
+
+                latencies, _ = await run(board, kind, filename, args.generations, args.seed)
+
+                tracemalloc.start()
+                start_memory = tracemalloc.get_traced_memory()[0]
+                _, allocated = await run(board, kind, filename, args.memory_generations, args.seed, measure_memory=True)
+                peak = tracemalloc.get_traced_memory()[1] - start_memory
+                tracemalloc.stop()
+
+                total = sum(latencies) / 1e9
+                result = {
+                    'pattern': filename or kind,
+                    'size': size,
+                    'engine': engine,
+                    'ran_as': board.engine,
+                    'generations': len(latencies),
+                    'gens_per_sec': round(len(latencies) / total, 1) if total else None,
+                    'latency_ms': {
+                        'p50': round(percentile(latencies, 0.5) / 1e6, 3),
+                        'p90': round(percentile(latencies, 0.9) / 1e6, 3),
+                        'p99': round(percentile(latencies, 0.99) / 1e6, 3),
+                        'max': round(max(latencies) / 1e6, 3),
+                    },
+                    'peak_kib': round(peak / 1024, 1),
+                    'alloc_kib_per_gen': round(sum(allocated) / len(allocated) / 1024, 1) if allocated else None,
+                }
+                results.append(result)
+                print(f"{size:>5} {engine:<7} {result['pattern']:<28.28} {len(latencies):>6} gens "
+                      f"{result['gens_per_sec']:>9} gen/s  p50 {result['latency_ms']['p50']:>8} ms  "
+                      f"p99 {result['latency_ms']['p99']:>8} ms  peak {result['peak_kib']:>8} KiB  "
+                      f"alloc {result['alloc_kib_per_gen']:>7} KiB/gen")
+    return results
+
+
+def commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Life engines headless")
+    parser.add_argument('--sizes', default='80,160,480,1024', help="comma-separated board sizes")
+    parser.add_argument('--engines', default='lists,sparse,bits', help="comma-separated engines (lists, sparse, bits, bands, tiles, numpy)")
+    parser.add_argument('--patterns', default='', help="comma-separated pattern names, 'soup' or 'kaleidosoup' (default: all)")
+    parser.add_argument('--generations', type=int, default=100, help="most generations timed per run")
+    parser.add_argument('--memory-generations', type=int, default=20, help="generations traced for memory per run")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', default='life-bench.json')
+    args = parser.parse_args()
+
+    args.sizes = [int(size) for size in args.sizes.split(',')]
+    args.engines = args.engines.split(',')
+    args.patterns = [name for name in args.patterns.split(',') if name]
+
+    # headless: no drawing and no multicast
+    life.RENDERER = 'none'
+    life.TELEMETRY = False
+    life.DEBUG = False
+
+    os.chdir(HERE)
+    results = asyncio.run(benchmark(args))
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'commit': commit(),
+            'python': sys.version.split()[0],
+            'seed': args.seed,
+            'results': results,
+        }, f, indent=1)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
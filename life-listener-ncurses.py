@@ -1,59 +1,268 @@
 #!/usr/bin/env python3
 #
-# runs on a computer to follow the state of the Life grid
+# runs on a computer to follow the state of the Life grid on any number of
+# Prestos at once
+#
+# Datagrams are read by an asyncio endpoint as they arrive and folded into
+# per-device stats, kept in bounded rings; the screen is redrawn on its own
+# timer, so a burst of datagrams never waits on curses. Tab switches which
+# device's board and phase timings are shown, q quits.
+#
+# With --record, every datagram is also logged (see life_log.py); with
+# --replay, logs are played back instead of listening, at --speed times
+# real time:
+#
+#     ./life-listener-ncurses.py --record soak
+#     ./life-listener-ncurses.py --replay soak-0001.ltl soak-0002.ltl --speed 10
 
+import argparse
+import asyncio
 import curses
-import json
+import locale
 import socket
 import struct
+from collections import deque
+
+from life_log import LogReader, LogWriter
+from life_telemetry import Mirror, decode
 
 MCAST_GRP = '239.255.255.250'
 MCAST_PORT = 32301
 
+HISTORY = 256       # fps samples, steady states and datagrams kept per device
+REDRAW_RATE = 10    # screen redraws per second, at most
+RECEIVE_BUFFER = 1 << 20
+
 # UDP
 def init_socket():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
     s.bind((MCAST_GRP, MCAST_PORT))
     mreq = struct.pack("4sl", socket.inet_aton(MCAST_GRP), socket.INADDR_ANY
     )
     s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+    s.setblocking(False)
     return s
 
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Device:
+    # everything known about one board, keyed by its address
+    def __init__(self, address):
+        self.address = address
+        self.generation = 0
+        self.alive = None
+        self.fps = deque(maxlen=HISTORY)
+        self.steady = deque(maxlen=HISTORY)     # generations to reach steady state
+        self.settled = False
+        self.cycle = None
+        self.phases = None
+        self.seed = None
+        self.memory = None
+        self.mirror = Mirror()
+
+        # 1 for each datagram received and 0 for each one lost, in sequence order
+        self.arrivals = deque(maxlen=HISTORY)
+        self.sequence = None
+
+    def receive(self, sequence, events):
+        # binary datagrams are numbered, so gaps are lost datagrams (a
+        # sequence of 0 is a restarted board)
+        if sequence is not None:
+            if sequence and self.sequence is not None:
+                missed = (sequence - self.sequence - 1) & 0xffffffff
+                self.arrivals.extend([0] * min(missed, HISTORY))
+            self.sequence = sequence
+        self.arrivals.append(1)
+
+        for event in events:
+            self.mirror.apply(event)
+            kind = event['event']
+            if kind == 'start':
+                self.settled = False
+            elif kind == 'generation':
+                if event['generation'] < self.generation:
+                    # a new board
+                    self.settled = False
+                self.generation = event['generation']
+                self.fps.append(event['fps_raw'])
+                self.alive = event.get('alive')
+            elif kind == 'steady_state':
+                if 'matched' in event:
+                    self.cycle = (event['generation'], event.get('period'))
+                    if not self.settled:
+                        self.steady.append(event['generation'])
+                self.settled = True
+            elif kind == 'profile':
+                self.phases = event['phases']
+            elif kind == 'seed':
+                self.seed = event
+            elif kind == 'memory':
+                self.memory = event
+
+    def loss(self):
+        # fraction of recent datagrams lost
+        if not self.arrivals:
+            return 0
+        return 1 - sum(self.arrivals) / len(self.arrivals)
+
+    def summary(self):
+        fps = steady = '-'
+        if self.fps:
+            fps = '/'.join(f"{percentile(self.fps, fraction):.1f}" for fraction in (0.5, 0.9, 0.99))
+        if self.steady:
+            steady = f"{len(self.steady)}: {min(self.steady)}/{percentile(self.steady, 0.5)}/{max(self.steady)}"
+        alive = '-' if self.alive is None else self.alive
+        return (f"{self.address:<16} {self.generation:>8} {alive:>7} {fps:>20} "
+                f"{self.loss():>6.1%} {steady:>22}")
+
+
+class ListenerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, devices, log=None):
+        self.devices = devices
+        self.log = log
+        self.errors = 0
+
+    def datagram_received(self, data, addr):
+        if self.log:
+            self.log.write(data, addr[0])
+        try:
+            sequence, events = decode(data)
+        except ValueError:
+            self.errors += 1
+            return
+        device = self.devices.get(addr[0])
+        if device is None:
+            device = self.devices[addr[0]] = Device(addr[0])
+        device.receive(sequence, events)
+
+
 # curses
-def curses_app(stdscr):
-    s = init_socket()
+def draw(stdscr, devices, selected, errors):
+    rows, columns = stdscr.getmaxyx()
 
-    curses.use_default_colors()
+    def line(row, column, text):
+        if row < rows - 1:
+            stdscr.addstr(row, column, text[:columns - column - 1])
+
+    stdscr.erase()
+    line(0, 0, f"Listening on {MCAST_GRP}:{MCAST_PORT}: {len(devices)} devices, "
+               f"{errors} bad datagrams (tab switches, q quits)")
+    line(2, 2, f"{'Device':<16} {'Gen':>8} {'Alive':>7} {'FPS p50/p90/p99':>20} "
+               f"{'Lost':>6} {'Steady n: min/p50/max':>22}")
+    addresses = sorted(devices)
+    for row, address in enumerate(addresses):
+        marker = '>' if address == selected else ' '
+        line(3 + row, 0, f"{marker} {devices[address].summary()}")
 
-    stdscr.clear()
-    stdscr.addstr(0, 0, "Listening...")
-    stdscr.refresh()
+    device = devices.get(selected)
+    if not device:
+        return
+    row = 4 + len(addresses)
+    if device.seed:
+        seed = device.seed
+        line(row, 0, f"Current {seed['kind']}: seed {seed['seed']}, chance {seed['chance']}, border {seed['border']}")
+        row += 1
+    if device.cycle:
+        line(row, 0, f"Last steady state at generation {device.cycle[0]}, period {device.cycle[1]}")
+    row += 1
+    if device.memory:
+        memory = device.memory
+        line(row, 0, f"Heap per generation: mean {memory['mean']} bytes, max {memory['max']}, "
+                     f"{memory['collections']} collections")
+        row += 1
+    if device.phases:
+        line(row, 0, "Phase timings (us, min/mean/max):")
+        for phase, (low, mean, high) in device.phases.items():
+            row += 1
+            line(row, 2, f"{phase:<10} {low:>7} {mean:>7} {high:>7}")
+        row += 1
+    if device.mirror.board:
+        draw_board(line, device.mirror, row + 1, rows, columns)
 
-    while True:
-        raw, addr = s.recvfrom(100)
-        data = json.loads(raw)
 
-        if data['event'] == 'start':
-            stdscr.clear()
-            stdscr.addstr(0, 0, "Listening...")
+def draw_board(line, mirror, top, rows, columns):
+    # upper and lower half blocks, clipped to the terminal
+    line(top, 0, f"Board at generation {mirror.generation}:")
+    for row in range(min((mirror.height + 1) // 2, rows - top - 2)):
+        cells = []
+        for x in range(min(mirror.width, columns - 1)):
+            upper = mirror.cell(x, row*2)
+            lower = mirror.cell(x, row*2 + 1) if row*2 + 1 < mirror.height else 0
+            cells.append(' ▀▄█'[upper | lower << 1])
+        line(top + 1 + row, 0, ''.join(cells))
 
-        if data['event'] == 'generation':
-            stdscr.addstr(2, 0, f"Generation: {data['generation']}       ")
-            if 'alive' in data:
-                stdscr.addstr(3, 0, f"Cells alive: {data['alive']} / 6400       ")
-            stdscr.addstr(4, 0, f"FPS: {data['fps']}")
 
-        if data['event'] == 'steady_state':
-            stdscr.clear()
-            stdscr.addstr(0, 0, "Listening...")
+async def replay(paths, protocol, speed):
+    # feed logged datagrams to the protocol, spaced out as they were received
+    loop = asyncio.get_running_loop()
+    start = None
+    for path in paths:
+        reader = LogReader(path)
+        for received, address, data in reader.records():
+            if start is None:
+                start = (received, loop.time())
+            # always yield, so the screen still redraws when replaying flat out
+            delay = (received - start[0]) / speed - (loop.time() - start[1])
+            await asyncio.sleep(max(delay, 0))
+            protocol.datagram_received(data, (address, 0))
+        reader.close()
 
-            stdscr.addstr(6, 0, f"Previous final generation: {data['generation']}")
-            if 'cycle_index' in data and 'matched' in data:
-                stdscr.addstr(7, 0, f"Cycle index & matched: {data['cycle_index'], data['matched']}")
 
-        stdscr.refresh()
-    stdscr.getkey()
+async def listen(stdscr, args):
+    curses.use_default_colors()
+    curses.curs_set(0)
+    stdscr.nodelay(True)
+
+    devices = {}
+    log = LogWriter(args.record) if args.record else None
+    if args.replay:
+        transport = None
+        protocol = ListenerProtocol(devices, log)
+        replaying = asyncio.create_task(replay(args.replay, protocol, args.speed))
+    else:
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(lambda: ListenerProtocol(devices, log),
+                                                                  sock=init_socket())
+
+    selected = None
+    try:
+        while True:
+            key = stdscr.getch()
+            if key == ord('q'):
+                break
+            addresses = sorted(devices)
+            if addresses and (key == ord('\t') or selected not in devices):
+                index = addresses.index(selected) + 1 if selected in devices else 0
+                selected = addresses[index % len(addresses)]
+
+            draw(stdscr, devices, selected, protocol.errors)
+            stdscr.refresh()
+            await asyncio.sleep(1 / REDRAW_RATE)
+    finally:
+        if transport:
+            transport.close()
+        else:
+            replaying.cancel()
+        if log:
+            log.close()
+
+
+def curses_app(stdscr, args):
+    asyncio.run(listen(stdscr, args))
 
 if __name__ == "__main__":
-    curses.wrapper(curses_app)
+    parser = argparse.ArgumentParser(description="Follow Life boards over multicast telemetry")
+    parser.add_argument('--record', metavar='PREFIX', help="also log every datagram to PREFIX-NNNN.ltl")
+    parser.add_argument('--replay', metavar='LOG', nargs='+', help="play back logs instead of listening")
+    parser.add_argument('--speed', type=float, default=1, help="replay speed, as a multiple of real time")
+    args = parser.parse_args()
+
+    # for the block characters
+    locale.setlocale(locale.LC_ALL, '')
+    curses.wrapper(curses_app, args)
@@ -5,6 +5,8 @@
 import socket
 import struct
 
+from life_telemetry import decode
+
 MCAST_GRP = '239.255.255.250'
 MCAST_PORT = 32301
 
@@ -15,10 +17,21 @@ mreq = struct.pack("4sl", socket.inet_aton(MCAST_GRP), socket.INADDR_ANY
 )
 s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
 
+sequences = {}
 try:
     while True:
-        data, addr = s.recvfrom(100)
-        print(data.decode('utf-8'))
+        data, addr = s.recvfrom(2048)
+        try:
+            sequence, events = decode(data)
+        except ValueError as e:
+            print(f"{addr[0]}: {e}")
+            continue
+        last = sequences.get(addr)
+        if sequence and last is not None and sequence != (last + 1) & 0xffffffff:
+            print(f"{addr[0]}: lost {(sequence - last - 1) & 0xffffffff} datagrams")
+        sequences[addr] = sequence
+        for event in events:
+            print(event)
 except KeyboardInterrupt:
     pass
 
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# runs on a computer to search seeded soups for long-lived ones, headless
+#
+# Each soup is set up and stepped by Life itself, with its cycle detection,
+# in a pool of worker processes. Results are appended to a JSON lines file as
+# they come in, and seeds already in the file for the same kind and size are
+# skipped, so a run that's stopped picks up where it left off:
+#
+#     ./life-search.py --count 10000 --kind kaleidosoup -o search.jsonl
+#
+# Soups come from life_soup, so a seed found here makes the same soup on the
+# Presto with life.setup(kind='kaleidosoup', seed=...).
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from multiprocessing import Pool
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.join(HERE, 'host'))
+
+import life
+
+board = None
+loop = None
+
+
+def init_worker(size, engine):
+    # one headless board per process, reused for every soup it runs
+    global board, loop
+    # ^C is for the main process, which stops the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    life.RENDERER = 'none'
+    life.TELEMETRY = False
+    life.DEBUG = False
+    life.WIDTH = life.HEIGHT = size
+    life.ENGINE = engine
+    os.chdir(HERE)
+
+    loop = asyncio.new_event_loop()
+    board = life.Life()
+
+
+async def run_soup(seed, kind, max_generations):
+    board.setup(kind=kind, seed=seed)
+    board.countdown = 0
+
+    while board.generation < max_generations:
+        await board.update_grid()
+        await board.handle_cycles()
+        if board.countdown:
+            # settled: the lifespan is when the repeating state first appeared
+            return {
+                'seed': seed,
+                'lifespan': board.candidate_first,
+                'population': board.population(),
+                'period': board.period,
+            }
+
+    # still going, or cycling with a period longer than MAX_CYCLES
+    return {'seed': seed, 'lifespan': None, 'population': board.population(), 'period': None}
+
+
+def search(job):
+    return loop.run_until_complete(run_soup(*job))
+
+
+def completed(path):
+    # (seed, kind, size) for each soup already in the output, trimming any
+    # line cut short when a run was stopped
+    searched = set()
+    good = 0
+    try:
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                    searched.add((result['seed'], result['kind'], result['size']))
+                except (ValueError, KeyError):
+                    break
+                good += len(line)
+    except FileNotFoundError:
+        return searched
+    with open(path, 'r+b') as f:
+        f.truncate(good)
+    return searched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search seeded Life soups for long-lived ones")
+    parser.add_argument('--first', type=int, default=0, help="first seed")
+    parser.add_argument('--count', type=int, default=1000, help="number of seeds")
+    parser.add_argument('--kind', default='soup', choices=('soup', 'kaleidosoup'))
+    parser.add_argument('--size', type=int, default=life.WIDTH, help="board width and height")
+    parser.add_argument('--engine', default='bits', help="engine (lists, sparse, bits, bands, tiles, numpy)")
+    parser.add_argument('--max-generations', type=int, default=10000, help="give up on a soup after this many")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--top', type=int, default=10, help="longest-lived seeds to list at the end")
+    parser.add_argument('-o', '--output', default='life-search.jsonl')
+    args = parser.parse_args()
+
+    done = completed(args.output)
+    seeds = [seed for seed in range(args.first, args.first + args.count)
+             if (seed, args.kind, args.size) not in done]
+    print(f"{args.count - len(seeds)} seeds already searched as {args.kind} at {args.size}, {len(seeds)} to go")
+
+    pool = Pool(args.workers, initializer=init_worker, initargs=(args.size, args.engine))
+    with open(args.output, 'a') as output:
+        jobs = [(seed, args.kind, args.max_generations) for seed in seeds]
+        try:
+            for count, result in enumerate(pool.imap_unordered(search, jobs), 1):
+                result.update(kind=args.kind, size=args.size)
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+                if count % 100 == 0:
+                    print(f"{count}/{len(seeds)}")
+        except KeyboardInterrupt:
+            pool.terminate()
+            print("Stopped; run again to carry on")
+            return
+    pool.close()
+    pool.join()
+
+    with open(args.output) as f:
+        results = [json.loads(line) for line in f]
+    results.sort(key=lambda result: result['lifespan'] if result['lifespan'] is not None else float('inf'),
+                 reverse=True)
+    for result in results[:args.top]:
+        print(f"seed {result['seed']:>8} {result['kind']:<11} {result['size']:>4}: "
+              f"lifespan {result['lifespan']}, population {result['population']}, period {result['period']}")
+
+
+if __name__ == "__main__":
+    main()
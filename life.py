@@ -1,23 +1,70 @@
 import asyncio
-import json
-import re
 import socket
 import sys
 import time
-from random import random
+from array import array
+from random import getrandbits
 
 import machine
 import network
 from presto import Presto
 
+from hashlife import HashLife
+from life_bands import BandedGrid
+from life_bits import BitGrid
+from life_catalogue import choose, read_catalogue
+from life_profile import FRAME_PHASES, STEP_PHASES, MemoryProfiler, PhaseProfiler
+from life_render import FramebufferRenderer, NullRenderer, RunRenderer
+from life_rle import load_pattern, read_rle
+from life_rules import CENTRE, DEFAULT_RULE, compile_rule, totalistic
+from life_soup import kaleidosoup, soup, unpack
+from life_telemetry import SOUPS, Stream, Telemetry
+from life_tiles import TileGrid
+
 
 FULL_RES    = False
 WIDTH       = 80
 HEIGHT      = 80
 DEBUG       = False
-MAX_CYCLES  = 6 # set 0 to disable cycle detection
+MAX_CYCLES  = 64 # generations of hashes kept; set 0 to disable cycle detection
 FILENAME    = 'boss-synthesis'
 LOG_COUNT   = True
+TELEMETRY   = True # multicast events; off for headless runs
+TELEMETRY_BATCH = 16 # generations sent per datagram
+TELEMETRY_RATE  = 5 # datagrams per second, at most; start, steady state and profile events go at once
+STREAM      = False # also stream the board itself, as deltas and a rolling refresh, for listeners to mirror
+STREAM_COLUMNS = 8 # board columns refreshed with each datagram while streaming
+PROFILE     = 0 # if set, time each phase of the loop and send a summary every PROFILE generations
+FRAME_RATE  = 30 # display refreshes per second, at most; each draws every cell changed since the last
+GENERATION_RATE = 0 # generations per second, at most; 0 steps flat out, several per frame if they're quick
+MEMORY      = 0 # if set, measure heap allocation and collections per generation, sent every MEMORY generations
+CELL_GAP    = 1 # 0 joins neighbouring cells, so runs of changes draw as one rectangle
+RENDERER    = 'runs' # 'runs' (PicoGraphics rectangles), 'framebuffer' (direct writes)
+                     # or 'none' (headless)
+SOUP_CHANCE = 0.15 # density of soups and kaleidosoups
+RESEED      = 'kaleidosoup' # what follows a steady state: 'soup', 'kaleidosoup' or 'catalogue'
+                            # (a pattern from life-rles/catalogue.lci; see life_catalogue.py)
+CATALOGUE_BUDGET = 2000 # generations a pattern from the catalogue may take to settle, at most
+ENGINE      = 'lists' # 'lists', 'sparse' (active cells only), 'bits' (bit-packed rows),
+                      # 'bands' (bit-packed rows, stepped in bands across cores),
+                      # 'tiles' (an unbounded plane, seen through the board)
+                      # or 'numpy' (whole-board arrays, with numpy, or ulab for totalistic rules)
+WORKERS     = 2 # bands stepped at once by the 'bands' engine; the Presto has two cores
+PLANE_MARGIN = 240 # the 'tiles' engine drops cells this far off the board; 0 keeps them all
+
+# (dx, dy, bit) for each neighbour: the bit for a cell as seen from the
+# neighbour at dx, dy (see life_rules)
+NEIGHBOUR_BITS = (
+    (-1, -1, 256), (-1, 0, 32), (-1, 1, 4),
+    (0, -1, 128),               (0, 1, 2),
+    (1, -1, 64),   (1, 0, 8),   (1, 1, 1),
+)
+# and the bit for each neighbour as seen from the cell
+NEIGHBOURHOOD_BITS = (
+    (-1, -1, 1), (-1, 0, 8),  (-1, 1, 64),
+    (0, -1, 2),               (0, 1, 128),
+    (1, -1, 4),  (1, 0, 32),  (1, 1, 256),
+)
 
 MCAST_GRP   = '239.255.255.250'
 MCAST_PORT  = 32301
@@ -27,25 +74,65 @@ class Life:
     def __init__(self):
         self.presto = Presto(full_res=FULL_RES)
         self.display = self.presto.display
-        self.wipe()
 
-        # canvas (it should be possible to calculate this)
-        # (but I need to fix up draw_block first)
+        # canvas, with the cell size worked out from the display
         self.width = WIDTH
         self.height = HEIGHT
+        display_width, display_height = self.display.get_bounds()
+        cell = min(display_width // self.width, display_height // self.height)
+        gap = CELL_GAP if cell > 2 else 0
+
+        if RENDERER == 'framebuffer':
+            self.renderer = FramebufferRenderer(memoryview(self.display), display_width, display_height, cell, gap)
+        elif RENDERER == 'none':
+            self.renderer = NullRenderer()
+        else:
+            self.renderer = RunRenderer(self.display, cell, gap)
+        self.headless = isinstance(self.renderer, NullRenderer)
+        self.wipe()
 
         # rules
-        self.born = [3]
-        self.survive = [2, 3]
+        self.rule = None
+        self.set_rule(DEFAULT_RULE)
+        self.engine = ENGINE
 
         self.socket = False
-        self.socket_setup_task =  asyncio.create_task(self.setup_socket())
+        self.stream = Stream(self.width, self.height, STREAM_COLUMNS) if TELEMETRY and STREAM else None
+        if TELEMETRY:
+            self.socket_setup_task =  asyncio.create_task(self.setup_socket())
 
         self.start_tick = 0
         self.end_tick = 0
+        self.profiler = PhaseProfiler(PROFILE, STEP_PHASES) if PROFILE else None
+        self.frame_profiler = PhaseProfiler(PROFILE, FRAME_PHASES) if PROFILE else None
+        self.generation_rate = GENERATION_RATE
+        self.memory = MemoryProfiler(MEMORY) if MEMORY else None
         self.generation = 0
         self.cycle_index = 0
 
+        # Zobrist keys: the grid hash is the XOR of the keys of all live cells
+        # (30 bits keeps them as small ints on MicroPython)
+        self.zobrist = [getrandbits(30) for _ in range(self.width * self.height)]
+        self.grid_hash = 0
+
+        # live cells, in total and per row, kept up to date as cells flip
+        self.alive = 0
+        self.row_population = array('H', [0] * self.height)
+
+        # allocated once, so stepping allocates nothing: the lists engine
+        # steps the grid in place and swaps between two neighbour buffers,
+        # and a candidate cycle's grid is copied rather than held
+        self.neighbour_buffers = [self.empty_neighbours(), self.empty_neighbours()]
+        self.candidate_columns = self.empty_grid()
+        self.candidate_rows = [0] * self.height
+        self.candidate_grid = None
+
+        # the 'bands' engine's workers are started once and kept across boards
+        self.banded = None
+
+        # what each pattern does, worked out ahead of time
+        self.catalogue = read_catalogue()
+
 
     ### UDP setup
     async def setup_socket(self):
@@ -58,66 +145,47 @@ class Life:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         s.bind(addr)
+        # never wait on the network: a datagram that can't go now is dropped
+        s.setblocking(False)
+        self.telemetry = Telemetry(s, (MCAST_GRP, MCAST_PORT), TELEMETRY_BATCH, TELEMETRY_RATE)
+        if self.stream:
+            self.stream.telemetry = self.telemetry
         self.socket = s
 
     async def send_start(self):
         if not self.socket:
             return
-
-        info = {
-            'event': 'start',
-        }
-        self.socket.sendto(json.dumps(info), (MCAST_GRP, MCAST_PORT))
+        self.telemetry.start()
 
     async def send_generation(self):
         if not self.socket:
             return
-        duration = self.end_tick - self.start_tick
-        fps_raw = 1000/duration
-        fps = f"{fps_raw:.2f}"
-
-        info = {
-            'event': 'generation',
-            'fps': fps,
-            'fps_raw': fps_raw,
-            'generation': self.generation,
-        }
+        # at least 1ms, since a fast host can finish a generation inside one tick
+        duration = max(time.ticks_diff(self.end_tick, self.start_tick), 1)
+        alive = self.population() if LOG_COUNT else -1
+        self.telemetry.generation(self.generation, 1000/duration, alive)
+        if self.stream:
+            self.stream.send(self.generation)
+
+    async def send_profile(self):
+        if not self.socket:
+            return
+        summary = self.profiler.summary()
+        summary.update(self.frame_profiler.summary())
+        self.telemetry.profile(self.generation, summary)
 
-        if LOG_COUNT:
-            info['alive'] = sum([sum([cell for cell in row]) for row in self.grid])
-        self.socket.sendto(json.dumps(info), (MCAST_GRP, MCAST_PORT))
+    async def send_memory(self):
+        if not self.socket:
+            return
+        self.telemetry.memory(self.generation, *self.memory.summary())
 
     async def send_steady_state(self, matched: int=None):
         if not self.socket:
             return
-
-        info = {
-            'event': 'steady_state',
-            'generation': self.generation,
-        }
-        if matched:
-            info['cycle_index'] = self.cycle_index
-            info['matched'] = matched
-        self.socket.sendto(json.dumps(info), (MCAST_GRP, MCAST_PORT))
-
-
-    ### New grid setup
-    def setup(self, kind="rle", filename=None):
-        if DEBUG:
-            print(str(time.ticks_ms())+" - started")
-
-        if kind == 'rle' and not filename:
-            filename = FILENAME
-        self.grid, self.neighbours = self.initialise_everything(kind, filename)
-
-        self.draw_grid()
-        if DEBUG:
-            print(str(time.ticks_ms())+" - initialized grid, neighbours")
-
-        self.presto.update()
-
-        # capture up to MAX_CYCLES previous grids for comparison
-        self.cycles = [self.empty_grid() for _ in range(MAX_CYCLES)]
+        if matched is None:
+            self.telemetry.steady_state(self.generation)
+        else:
+            self.telemetry.steady_state(self.generation, self.cycle_index, matched, self.period)
 
 
     ### Presto display handling
@@ -126,34 +194,68 @@ class Life:
         self.display.clear()
         self.presto.update()
 
-    def draw_block(self, x, y):
-        self.display.pixel(x*3, y*3)
-        self.display.pixel(x*3+1, y*3)
-        self.display.pixel(x*3+1, y*3+1)
-        self.display.pixel(x*3, y*3+1)
-
-    def draw_grid(self):
-        BLACK = self.display.create_pen(0, 0, 0)
-        WHITE = self.display.create_pen(255, 255, 255)
-
-        self.display.set_pen(BLACK)
-        self.display.clear()
-        self.display.set_pen(WHITE)
-
+    def draw_grid(self, grid):
+        self.renderer.clear()
         for x in range(self.width):
             for y in range(self.height):
-                if self.grid[x][y]:
-                    self.draw_block(x, y)
+                if grid[x][y]:
+                    self.renderer.add(x, y, True)
+        self.renderer.flush()
+
+    def draw_rows(self, rows):
+        # draw_grid for BitGrid rows
+        self.renderer.clear()
+        for y, row in enumerate(rows):
+            if row:
+                self.renderer.add_row(y, 0, row)
+        self.renderer.flush()
+
+    def move_viewport(self, left, top):
+        # show another part of the plane, with the 'tiles' engine
+        if self.engine != 'tiles':
+            raise ValueError(f"Only the 'tiles' engine has a plane to move over, not {self.engine}")
+        self.tiles.set_window(left, top, self.width, self.height)
+        view = self.tiles.rows(left, top, self.width, self.height)
+        self.draw_rows(view)
+        self.index_rows(view)
+        self.grid_hash = self.tiles.hash
+        if self.stream:
+            self.stream.load_rows(view)
+        self.presto.update()
 
     def change_cell(self, x, y, state):
-        WHITE = self.display.create_pen(255, 255, 255)
-        GREY = self.display.create_pen(51, 51, 51)
+        self.renderer.add(x, y, state)
 
+    def push_display(self, dirty):
+        if not dirty:
+            return
+        if hasattr(self.presto, 'partial_update'):
+            self.presto.partial_update(*dirty)
+        else:
+            self.presto.update()
+
+    def flip_cell(self, x, y, state):
+        self.grid_hash ^= self.zobrist[x*self.height + y]
         if state:
-            self.display.set_pen(WHITE)
+            self.alive += 1
+            self.row_population[y] += 1
         else:
-            self.display.set_pen(GREY)
-        self.draw_block(x, y)
+            self.alive -= 1
+            self.row_population[y] -= 1
+        if self.stream:
+            self.stream.flip(x, y)
+        self.change_cell(x, y, state)
+
+    def flip_row(self, y, row, new_row):
+        # flip_cell for a whole row of the bit-packed engines: the hash and
+        # population change once per row, and only drawing goes cell by cell
+        self.grid_hash ^= hash((y, row)) ^ hash((y, new_row))
+        population = bin(new_row).count('1')
+        self.alive += population - self.row_population[y]
+        self.row_population[y] = population
+        if self.stream:
+            self.stream.flip_row(y, row ^ new_row)
+        self.renderer.add_row(y, row, new_row)
 
 
     ### Noises
@@ -166,198 +268,348 @@ class Life:
 
 
     ### Life grid setup
-    def initialise_everything(self, kind, filename='spaceship'):
+    def initialise_everything(self, kind, filename='spaceship', fast_forward=0, seed=None):
+        # soups are packed rows first, which the bits engines use as they are:
+        # for those, (None, None) is returned, and there's no grid or
+        # neighbour counts to build
+        grid = None
+        self.packed = None
+        self.soup = None
+        self.runs = None
+        if kind in SOUPS:
+            # patterns bring their own rule; soups are always plain Life
+            self.set_rule(DEFAULT_RULE)
+            if seed is None:
+                seed = getrandbits(30)
         if kind == 'soup':
-            grid = self.initialize_soup(chance=0.15, border=20)
+            self.initialize_soup(seed, chance=SOUP_CHANCE, border=20)
         if kind == 'kaleidosoup':
-            grid = self.initialize_kaleidosoup(chance=0.15, border=5)
+            self.initialize_kaleidosoup(seed, chance=SOUP_CHANCE, border=5)
         if kind == 'rle':
             try:
-                with open(f'life-rles/{filename}.rle') as f:
-                    lines = f.readlines()
-                width, height, born, survive, line_data = self.parse_rle(lines)
+                width, height, rule, line_data = load_pattern(filename)
+                self.set_rule(rule)
                 x_offset = int((self.width - width)/2)
                 y_offset = int((self.height - height)/2)
+                if ENGINE == 'tiles' or fast_forward:
+                    # kept for the plane, or HashLife, which have room for
+                    # all of it
+                    line_data = list(line_data)
+                    self.runs = (line_data, x_offset, y_offset)
                 grid = self.build_grid(line_data, x_offset=x_offset, y_offset=y_offset)
             except Exception as e:
                 print(f"Specified filename {filename}.rle which didn't work: {e}")
                 raise
 
-        if not grid:
+        if not grid and not self.packed:
             raise Exception(f"Didn't understand kind {kind}")
 
+        if fast_forward:
+            grid = self.fast_forward(grid or unpack(self.packed, self.width, self.height), fast_forward)
+            self.packed = None
+            self.runs = None
+
+        self.choose_engine()
+        if self.packed and self.engine in ('bits', 'bands'):
+            return (None, None)
+        if not grid:
+            grid = unpack(self.packed, self.width, self.height)
         neighbours = self.initialize_neighbours(grid)
         return (grid, neighbours)
 
+    def choose_engine(self):
+        # ENGINE, unless it can't run the rule here
+        self.engine = ENGINE
+        if self.engine in ('bits', 'bands') and self.born is None:
+            print(f"Rule {self.rule} isn't totalistic; using the lists engine.")
+            self.engine = 'lists'
+        if self.engine == 'tiles' and (self.born is None or 0 in self.born):
+            print(f"Rule {self.rule} can't run on an unbounded plane; using the lists engine.")
+            self.engine = 'lists'
+        if self.engine == 'numpy':
+            try:
+                from life_numpy import ULAB
+            except ImportError:
+                print("No numpy or ulab here; using the lists engine.")
+                self.engine = 'lists'
+        if self.engine == 'numpy' and ULAB and self.born is None:
+            print(f"Rule {self.rule} isn't totalistic, which ulab can't run; using the lists engine.")
+            self.engine = 'lists'
+
+    def fast_forward(self, grid, generations):
+        # skip ahead with HashLife, then crop back to the board
+        # (HashLife has no edges, so patterns that reach them can differ);
+        # patterns start from their runs, so nothing's clipped beforehand
+        hashlife = HashLife(self.rule)
+        if self.runs:
+            line_data, x_offset, y_offset = self.runs
+            x_offset -= self.width//2
+            y_offset -= self.height//2
+            hashlife.load_cells([(x + x_offset + i, y + y_offset)
+                                 for x, y, length in line_data for i in range(length)])
+        else:
+            hashlife.load(grid, self.width, self.height)
+        hashlife.advance(generations)
+        if DEBUG:
+            print(str(time.ticks_ms())+f" - fast forwarded {generations}, {len(hashlife.nodes)} nodes")
+        return hashlife.window(self.width, self.height)
+
     def empty_grid(self):
-        return [[False for _ in range(self.width)] for _ in range(self.height)]
+        return [[False for _ in range(self.height)] for _ in range(self.width)]
+
+    def empty_neighbours(self):
+        return [[0 for _ in range(self.height)] for _ in range(self.width)]
 
-    def initialize_soup(self, chance=0.2, border=0):
+    def initialize_soup(self, seed, chance=0.2, border=0):
         # random starting point ('soup') with an optional border to give it room to grow
-        grid = self.empty_grid()
-        for x in range(border, self.width-border):
-            for y in range(border, self.height-border):
-                grid[x][y] = bool(random() < chance)
-        return grid
+        self.soup = ('soup', seed, chance, border)
+        self.packed = soup(self.width, self.height, seed, chance, border)
 
-    def initialize_kaleidosoup(self, chance=0.2, border=0):
+    def initialize_kaleidosoup(self, seed, chance=0.2, border=0):
         # soup, but four-fold symmetry
-        grid = self.empty_grid()
-        for x in range(border, self.width/2):
-            for y in range(border, self.height/2):
-                state = bool(random() < chance)
-                grid[x][y] = state
-                grid[self.width-x-1][y] = state
-                grid[x][self.height-y-1] = state
-                grid[self.width-x-1][self.height-y-1] = state
-        return grid
+        self.soup = ('kaleidosoup', seed, chance, border)
+        self.packed = kaleidosoup(self.width, self.height, seed, chance, border)
 
     def initialize_neighbours(self, grid):
-        neighbours = [[0 for _ in range(self.width)] for _ in range(self.height)]
-        for y in range(self.height):
-            for x in range(self.width):
-                neighbours[x][y] = self.count_neighbours(grid, x, y)
+        # only live cells contribute, so this costs one pass plus the population
+        neighbours = self.empty_neighbours()
+        for x in range(self.width):
+            column = grid[x]
+            for y in range(self.height):
+                if column[y]:
+                    self.set_neighbours(neighbours, x, y, +1)
         return neighbours
 
 
     ### RLE file parsing
-    def parse_rle_line(self, line):
-        pattern = re.compile(r'(\d*)([bo$!])')
-        result = []
-        pos = 0
-
-        # FIXME: not handling \d$ case
-        while pos < len(line):
-            match = pattern.search(line[pos:])
-            if not match:
-                break
-
-            count_str = match.group(1)
-            char = match.group(2)
-            num = int(count_str) if count_str else 1
-
-            result.append((num, char))
-            pos += len(match.group(0))
-
-        return result
-
     def parse_rle(self, lines):
-        header = lines[0]
-        lines = lines[1:]
-        lines = ''.join(lines).replace('\n', '')
-        header_pattern = re.compile(r'x\s?=\s?(\d+).*?y\s?=\s?(\d+).*?B(\d+).*?S(\d+.)')
-        header_matches = header_pattern.search(header)
-        try:
-            born = header_matches.group(3)
-            survive = header_matches.group(4)
-        # FIXME MicroPython throws a different index matching error here
-        except IndexError:
-            print("No or improper rule in file; defaulting to B3/S23.")
-            born = "3"
-            survive = "23"
-        width = int(header_matches.group(1))
-        height = int(header_matches.group(2))
-        line_data = self.parse_rle_line(lines)
-        line_data = [(1, match[1]) if match[0] == '' else (int(match[0]), match[1]) for match in line_data]
-        return width, height, born, survive, line_data
+        # line_data is a generator of (x, y, length) live runs, read from
+        # lines as it's consumed, so build the grid before closing the file
+        return read_rle(lines)
 
     def build_grid(self, line_data, x_offset=0, y_offset=0):
+        # anything outside the board is clipped
         grid = self.empty_grid()
-        x = x_offset
-        y = y_offset
-
-        for entry in line_data:
-            num, kind = entry
-            if kind == 'b':
-                x += num
-            if kind == 'o':
-                for _ in range(num):
-                    grid[x][y] = True
-                    x += 1
-            if kind == '$':
-                x = x_offset
-                y += num
+
+        for x, y, length in line_data:
+            y += y_offset
+            if not 0 <= y < self.height:
+                continue
+            for x in range(max(x + x_offset, 0), min(x + x_offset + length, self.width)):
+                grid[x][y] = True
 
         return grid
 
 
     ### Grid calculations and generation handling
-    def set_neighbours(self, neighbours, x, y, change):
-        cells = [
-            (-1, -1), (-1, 0), (-1, 1),
-            (0, -1),           (0, 1),
-            (1, -1),   (1, 0), (1, 1)
-        ]
-        for dx, dy in cells:
+    def set_neighbours(self, neighbours, x, y, change, frontier=None):
+        # each neighbour holds a mask of its live neighbours (see life_rules)
+        # a flipped cell and everything around it may change next generation
+        if frontier is not None:
+            frontier.add((x, y))
+        for dx, dy, bit in NEIGHBOUR_BITS:
             if 0 <= x+dx < self.width and 0 <= y+dy < self.height:
-                neighbours[x+dx][y+dy] += change
+                neighbours[x+dx][y+dy] += change * bit
+                if frontier is not None:
+                    frontier.add((x+dx, y+dy))
         return neighbours
 
-    def count_neighbours(self, grid, x, y):
-        cells = [
-            (-1, -1), (-1, 0), (-1, 1),
-            (0, -1),           (0, 1),
-            (1, -1),   (1, 0), (1, 1)
-        ]
-
+    def neighbourhood(self, grid, x, y):
+        # mask of the live neighbours of (x, y), for indexing self.table
         neighbours = 0
-        for dx, dy in cells:
+        for dx, dy, bit in NEIGHBOURHOOD_BITS:
             nx, ny = x + dx, y + dy
-            if 0 <= nx < self.height and 0 <= ny < self.width:
+            if 0 <= nx < self.width and 0 <= ny < self.height:
                 if grid[nx][ny]:
-                    neighbours += 1
+                    neighbours |= bit
         return neighbours
 
+    def set_rule(self, rule):
+        # every engine uses the compiled table except 'bits' and 'bands',
+        # which only count neighbours and so needs a totalistic rule; compiling
+        # is slow, so it's only done when the rule changes
+        if rule == self.rule:
+            return
+        self.rule = rule
+        self.table = compile_rule(rule)
+        counts = totalistic(rule)
+        if counts:
+            self.born, self.survive = counts
+        else:
+            self.born, self.survive = None, None
+
+    def population(self):
+        if self.engine == 'tiles':
+            # the whole plane, not just the board
+            return self.tiles.population()
+        return self.alive
+
     async def update_grid(self):
-        new_grid = self.empty_grid()
-        new_neighbours = [[self.neighbours[x][y] for y in range(self.height)] for x in range(self.width)]
+        if self.engine in ('bits', 'bands'):
+            for y, row, new_row in self.bits.step():
+                self.flip_row(y, row, new_row)
+            self.generation += 1
+            self.grid = self.bits.rows
+            return
+
+        if self.engine == 'tiles':
+            for y, row, new_row in self.tiles.step():
+                self.flip_row(y, row, new_row)
+            self.generation += 1
+            # cycles are of the whole plane
+            self.grid = self.tiles.tiles
+            self.grid_hash = self.tiles.hash
+            return
+
+        if self.engine == 'numpy':
+            # the array keeps the hash and population itself; changes are
+            # only gone through one by one if they're drawn or streamed
+            grid = self.array
+            changed = grid.step()
+            if self.stream or not self.headless:
+                stream = self.stream
+                for x, y, state in grid.changes(changed):
+                    if stream:
+                        stream.flip(x, y)
+                    self.change_cell(x, y, state)
+            self.grid_hash = grid.hash
+            self.row_population[:] = array('H', grid.row_population())
+            self.alive = grid.population()
+            self.generation += 1
+            self.grid = grid.grid
+            return
+
+        if self.engine == 'sparse':
+            return self.update_frontier()
+
+        # each cell only reads its own state, so the grid is updated in
+        # place; neighbour counts are read from one buffer and written to
+        # the other, which starts as a copy
+        grid = self.grid
+        neighbours = self.neighbours
+        self.buffer ^= 1
+        new_neighbours = self.neighbour_buffers[self.buffer]
+        for x in range(self.width):
+            new_neighbours[x][:] = neighbours[x]
+        table = self.table
+        skip_empty = not table[0]
 
         for y in range(self.height):
             for x in range(self.width):
-                current_cell = self.grid[x][y]
-                neighbour_count = self.neighbours[x][y]
-                if not current_cell and not neighbour_count:
+                current_cell = grid[x][y]
+                neighbourhood = neighbours[x][y]
+                if not current_cell and not neighbourhood and skip_empty:
                     continue
 
-                if not current_cell and neighbour_count in self.born:
-                    new_grid[x][y] = True
-                    self.change_cell(x, y, True)
-                    new_neighbours = self.set_neighbours(new_neighbours, x, y, +1)
+                if current_cell:
+                    alive = table[neighbourhood | CENTRE]
+                else:
+                    alive = table[neighbourhood]
 
-                elif current_cell and neighbour_count not in self.survive:
-                    new_grid[x][y] = False
-                    self.change_cell(x, y, False)
-                    new_neighbours = self.set_neighbours(new_neighbours, x, y, -1)
+                if not current_cell and alive:
+                    grid[x][y] = True
+                    self.flip_cell(x, y, True)
+                    self.set_neighbours(new_neighbours, x, y, +1)
 
-                elif current_cell:
-                    new_grid[x][y] = True
+                elif current_cell and not alive:
+                    grid[x][y] = False
+                    self.flip_cell(x, y, False)
+                    self.set_neighbours(new_neighbours, x, y, -1)
 
         self.generation += 1
 
-        self.grid = new_grid
         self.neighbours = new_neighbours
 
+    def update_frontier(self):
+        # only visit cells that flipped, or had a neighbour flip, last generation
+        table = self.table
+        flips = []
+        for x, y in self.frontier:
+            current_cell = self.grid[x][y]
+            neighbourhood = self.neighbours[x][y]
+            if current_cell and not table[neighbourhood | CENTRE]:
+                flips.append((x, y, False))
+            elif not current_cell and table[neighbourhood]:
+                flips.append((x, y, True))
+
+        # every flip is known before any is applied, so the grid and
+        # neighbour counts are updated in place
+        grid = self.grid
+        frontier = set()
+        for x, y, state in flips:
+            grid[x][y] = state
+            self.flip_cell(x, y, state)
+            self.set_neighbours(self.neighbours, x, y, +1 if state else -1, frontier)
+
+        self.generation += 1
+
+        self.frontier = frontier
+
+    def index_grid(self, grid):
+        # the hash and population counts for a new grid, which flip_cell
+        # then keeps up to date
+        grid_hash = 0
+        row_population = self.row_population
+        for y in range(self.height):
+            row_population[y] = 0
+        for x in range(self.width):
+            column = grid[x]
+            for y in range(self.height):
+                if column[y]:
+                    grid_hash ^= self.zobrist[x*self.height + y]
+                    row_population[y] += 1
+        self.grid_hash = grid_hash
+        self.alive = sum(row_population)
+
+    def index_rows(self, rows):
+        # index_grid for the 'bits' engines, hashed by row to match flip_row
+        grid_hash = 0
+        row_population = self.row_population
+        for y, row in enumerate(rows):
+            grid_hash ^= hash((y, row))
+            row_population[y] = bin(row).count('1')
+        self.grid_hash = grid_hash
+        self.alive = sum(row_population)
+
     async def handle_cycles(self):
-        self.cycles[self.cycle_index] = self.grid
+        # the last MAX_CYCLES grid hashes are kept in a ring, with a dict from
+        # hash to ring slot (MicroPython reuses a dict's deleted slots, so it
+        # doesn't grow); a matching hash is only a candidate cycle, which is
+        # confirmed by a full grid comparison one period later
+        grid_hash = self.grid_hash
 
         # detect cycles if not already in a steady state countdown
         if not self.countdown:
-            cycle = False
-            for i in range(0, MAX_CYCLES):
-                if i == self.cycle_index:
-                    continue
-                if self.grid == self.cycles[i]:
-                    cycle = True
-                    break
-
-            if cycle:
-                self.countdown = 10
-                self.matched_index = i
-                await self.send_steady_state(matched=self.matched_index)
-            else:
-                self.cycle_index += 1
-                if self.cycle_index >= MAX_CYCLES:
-                    self.cycle_index = 0
+            if self.candidate:
+                if self.generation == self.candidate_generation + self.period:
+                    self.candidate = False
+                    # arrays compare cell by cell, so they're compared as bytes
+                grid = self.array.snapshot() if self.engine == 'numpy' else self.grid
+                if grid == self.candidate_grid:
+                        self.countdown = 10
+                        self.matched_index = self.candidate_slot
+                        await self.send_steady_state(matched=self.matched_index)
+
+            elif grid_hash in self.hash_slots:
+                matched = self.hash_slots[grid_hash]
+                self.period = self.generation - self.hash_generations[matched]
+                self.copy_candidate()
+                self.candidate = True
+                self.candidate_generation = self.generation
+                self.candidate_slot = matched
+                # the slot may be reused before the cycle's confirmed
+                self.candidate_first = self.hash_generations[matched]
+
+        # record this generation, dropping whatever the slot held before
+        old_hash = self.hashes[self.cycle_index]
+        if self.hash_slots.get(old_hash) == self.cycle_index:
+            del self.hash_slots[old_hash]
+        self.hashes[self.cycle_index] = grid_hash
+        self.hash_generations[self.cycle_index] = self.generation
+        self.hash_slots[grid_hash] = self.cycle_index
+        self.cycle_index += 1
+        if self.cycle_index >= MAX_CYCLES:
+            self.cycle_index = 0
 
         # count down to reset
         if self.countdown:
@@ -365,49 +617,198 @@ class Life:
             if not self.countdown:
                 await self.send_steady_state(matched=self.matched_index)
                 # await self.make_sound(440, 0.4)
-                self.setup(kind="kaleidosoup")
+                self.setup(kind=RESEED)
+
+
+    def copy_candidate(self):
+        # keep the grid for comparison a period later, in storage allocated
+        # up front, since the engines update their grids in place
+        if self.engine in ('bits', 'bands'):
+            self.candidate_rows[:] = self.grid
+            self.candidate_grid = self.candidate_rows
+        elif self.engine == 'numpy':
+            self.candidate_grid = self.array.snapshot()
+        elif self.engine == 'tiles':
+            # planes are new dicts each generation
+            self.candidate_grid = self.grid
+        else:
+            candidate = self.candidate_grid = self.candidate_columns
+            for x in range(self.width):
+                candidate[x][:] = self.grid[x]
 
 
     ### New grid setup
-    def setup(self, kind="rle", filename=None):
+    def pick_pattern(self):
+        # a catalogued pattern that stays on the board and settles within
+        # CATALOGUE_BUDGET generations, or FILENAME if none do
+        names = choose(self.catalogue, self.width, self.height, CATALOGUE_BUDGET)
+        if not names:
+            return FILENAME
+        return names[getrandbits(16) % len(names)]
+
+    def setup(self, kind="rle", filename=None, fast_forward=0, seed=None):
+        # seed picks the soup for soup kinds; it's random if not given, and
+        # sent over telemetry either way so the soup can be made again
         if DEBUG:
             print(str(time.ticks_ms())+" - started")
 
+        if kind == 'catalogue':
+            kind, filename = 'rle', self.pick_pattern()
         if kind == 'rle' and not filename:
             filename = FILENAME
-        self.grid, self.neighbours = self.initialise_everything(kind, filename)
-
-        self.draw_grid()
+        grid, neighbours = self.initialise_everything(kind, filename, fast_forward, seed)
+        self.buffer = 0
+        if self.socket and self.soup:
+            self.telemetry.seed(*self.soup, self.width, self.height)
+
+        if grid:
+            self.grid = grid
+            self.neighbours = self.neighbour_buffers[0]
+            for x in range(self.width):
+                self.neighbours[x][:] = neighbours[x]
+            self.draw_grid(self.grid)
+            self.index_grid(self.grid)
+            if self.stream:
+                self.stream.load(self.grid)
+        else:
+            # a soup for the bits engines, which is only ever packed rows
+            self.draw_rows(self.packed)
+            if self.stream:
+                self.stream.load_rows(self.packed)
         if DEBUG:
             print(str(time.ticks_ms())+" - initialized grid, neighbours")
 
+        if self.engine == 'bits':
+            self.bits = BitGrid(self.width, self.height, self.born, self.survive)
+        if self.engine == 'bands':
+            if not self.banded:
+                self.banded = BandedGrid(self.width, self.height, self.born, self.survive, WORKERS)
+            self.bits = self.banded
+            self.bits.set_counts(self.born, self.survive)
+        if self.engine in ('bits', 'bands'):
+            if self.packed:
+                self.bits.rows = self.packed
+            else:
+                self.bits.load(self.grid)
+            self.grid = self.bits.rows
+            self.index_rows(self.grid)
+
+        if self.engine == 'tiles':
+            self.tiles = TileGrid(self.born, self.survive, (0, 0, self.width, self.height), PLANE_MARGIN)
+            if self.runs:
+                self.tiles.load_runs(*self.runs)
+            else:
+                self.tiles.load(self.grid, self.width, self.height)
+            self.runs = None
+            self.grid = self.tiles.tiles
+            self.grid_hash = self.tiles.hash
+
+        if self.engine == 'numpy':
+            from life_numpy import ArrayGrid
+            self.array = ArrayGrid(self.width, self.height, self.rule, self.zobrist)
+            self.array.load(self.grid)
+            self.grid = self.array.grid
+            self.grid_hash = self.array.hash
+        if self.engine == 'sparse':
+            # with B0, empty cells can change too, so start with all of them
+            self.frontier = set()
+            for x in range(self.width):
+                for y in range(self.height):
+                    if self.grid[x][y] or self.neighbours[x][y] or self.table[0]:
+                        self.frontier.add((x, y))
+
         self.presto.update()
 
-        # capture up to MAX_CYCLES previous grids for comparison
-        self.cycles = [self.empty_grid() for _ in range(MAX_CYCLES)]
+        # hashes of up to MAX_CYCLES previous grids for comparison
+        self.hashes = [None for _ in range(MAX_CYCLES)]
+        self.hash_generations = [0 for _ in range(MAX_CYCLES)]
+        self.hash_slots = {}
+        self.candidate = False
+        self.candidate_first = 0
+        self.period = 0
         self.cycle_index = 0
-        self.generation = 0
+        self.generation = fast_forward
 
     async def _app_loop(self):
-        loop = asyncio.get_event_loop()
+        # stepping and drawing are separate tasks, so the simulation isn't
+        # held to the panel's rate: the renderer collects changes from as
+        # many generations as go by between frames, and draws each cell once
         self.countdown = 0
+        frames = asyncio.create_task(self._frame_loop())
+        try:
+            await self._step_loop()
+        finally:
+            frames.cancel()
+
+    async def _step_loop(self):
+        # every generation is checked for cycles and sent over telemetry,
+        # whether or not it's drawn
+        profiler = self.profiler
+        memory = self.memory
+        next_tick = time.ticks_ms()
 
         while True:
+            if memory:
+                memory.start()
             self.start_tick = time.ticks_ms()
+            if profiler:
+                profiler.start()
+
             await self.update_grid()
-            self.presto.update()
+            if profiler:
+                profiler.mark()
 
             if MAX_CYCLES:
                 await self.handle_cycles()
+            if profiler:
+                profiler.mark()
             self.end_tick = time.ticks_ms()
 
             await self.send_generation()
-            await asyncio.sleep(0)
+            if profiler:
+                profiler.mark()
+                if profiler.end():
+                    await self.send_profile()
+            if memory and memory.end():
+                await self.send_memory()
+
+            if self.generation_rate:
+                # a generation that runs late starts the schedule again
+                # rather than being made up for
+                next_tick = time.ticks_add(next_tick, 1000 // self.generation_rate)
+                delay = time.ticks_diff(next_tick, time.ticks_ms())
+                if delay < 0:
+                    next_tick = time.ticks_ms()
+                await asyncio.sleep(max(delay, 0) / 1000)
+            else:
+                await asyncio.sleep(0)
+
+    async def _frame_loop(self):
+        profiler = self.frame_profiler
+        frame = 1000 // FRAME_RATE
+
+        while True:
+            start = time.ticks_ms()
+            if profiler:
+                profiler.start()
+
+            dirty = self.renderer.flush()
+            if profiler:
+                profiler.mark()
+            self.push_display(dirty)
+            if profiler:
+                profiler.mark()
+                profiler.end()
+
+            elapsed = time.ticks_diff(time.ticks_ms(), start)
+            await asyncio.sleep(max(frame - elapsed, 0) / 1000)
 
 
 ### Go!
-if __name__ == "__main__":
+async def main():
     life = Life()
     life.setup(kind='rle', filename='blinkers')
+    await life._app_loop()
 
-    asyncio.run(life._app_loop())
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+# Banded stepping for BitGrid, across cores
+#
+# The board is split into horizontal bands of rows, one per worker, and each
+# band is stepped at the same time. A band's next generation depends only on
+# its own rows and the row either side of it (the halo), which every band
+# reads from the current generation and none writes, so the bands need no
+# merging beyond putting their changes back in band order; the result is the
+# same as BitGrid.step's, row for row.
+#
+# On the Presto the second core runs a band in a _thread worker, started
+# once and woken by a lock each generation. On a computer, where threads
+# don't run Python in parallel, bands go to a pool of processes instead,
+# with the rows passed through shared memory: the main process writes the
+# current rows to one area and the workers write their bands to the other.
+# Workers send nothing back, since pickling their changes would cost about as
+# much as stepping; the main process finds the changes by comparing old rows
+# with new as it reads them.
+
+from life_bits import BitGrid
+
+try:
+    import atexit
+    from multiprocessing import Pool, current_process, shared_memory
+except ImportError:
+    import _thread
+    Pool = None
+
+
+def band_ranges(height, bands):
+    # (start, end) rows of each band, as even as they'll go
+    return [(height * band // bands, height * (band + 1) // bands) for band in range(bands)]
+
+
+# host worker processes: a BitGrid over the shared rows, made by the pool's
+# initializer
+worker_grid = None
+worker_memory = None
+
+
+def init_worker(name, width, height):
+    global worker_grid, worker_memory
+    worker_memory = shared_memory.SharedMemory(name=name)
+    worker_grid = BitGrid(width, height)
+
+
+def step_band(job):
+    start, end, born, survive = job
+    grid = worker_grid
+    if (grid.born, grid.survive) != (born, survive):
+        grid.set_counts(born, survive)
+    stride = (grid.width + 7) // 8
+    area = grid.height * stride
+    buffer = worker_memory.buf
+
+    rows = grid.rows
+    for y in range(max(start - 1, 0), min(end + 1, grid.height)):
+        rows[y] = int.from_bytes(buffer[y*stride:(y + 1)*stride], 'little')
+    grid.step_rows(start, end)
+    spare = grid.spare
+    for y in range(start, end):
+        buffer[area + y*stride:area + (y + 1)*stride] = spare[y].to_bytes(stride, 'little')
+
+
+class BandedGrid(BitGrid):
+    def __init__(self, width, height, born=(3,), survive=(2, 3), workers=2):
+        super().__init__(width, height, born, survive)
+        if Pool and current_process().daemon:
+            # already a pool's worker, as in life-search, and those can't
+            # start pools of their own; step serially
+            workers = 1
+        self.bands = band_ranges(height, max(1, min(workers, height)))
+        self.pool = None
+        self.threads = []
+        if len(self.bands) < 2:
+            return
+
+        if Pool:
+            self.stride = (width + 7) // 8
+            self.memory = shared_memory.SharedMemory(create=True, size=2 * height * self.stride)
+            self.pool = Pool(len(self.bands), initializer=init_worker,
+                             initargs=(self.memory.name, width, height))
+            # the shared memory outlives the process unless it's unlinked
+            atexit.register(self.close)
+        else:
+            # band 0 is stepped by the caller, the rest by one thread each;
+            # every thread waits on its start lock and releases its done lock
+            self.band_changes = [[] for _ in self.bands]
+            self.stopping = False
+            for band in range(1, len(self.bands)):
+                start, done = _thread.allocate_lock(), _thread.allocate_lock()
+                start.acquire()
+                done.acquire()
+                self.threads.append((start, done))
+                _thread.start_new_thread(self.worker, (band, start, done))
+
+    def worker(self, band, start, done):
+        begin, end = self.bands[band]
+        changes = self.band_changes[band]
+        while True:
+            start.acquire()
+            try:
+                if self.stopping:
+                    return
+                changes.clear()
+                self.step_rows(begin, end, changes)
+            finally:
+                done.release()
+
+    def step(self):
+        if self.pool:
+            return self.step_processes()
+        if not self.threads:
+            return super().step()
+
+        for start, _ in self.threads:
+            start.release()
+        changes = self.band_changes[0]
+        changes.clear()
+        self.step_rows(*self.bands[0], changes)
+        for _, done in self.threads:
+            done.acquire()
+
+        self.swap()
+        result = []
+        for band in self.band_changes:
+            result.extend(band)
+        return result
+
+    def step_processes(self):
+        stride = self.stride
+        area = self.height * stride
+        buffer = self.memory.buf
+        for y, row in enumerate(self.rows):
+            buffer[y*stride:(y + 1)*stride] = row.to_bytes(stride, 'little')
+
+        jobs = [(start, end, self.born, self.survive) for start, end in self.bands]
+        self.pool.map(step_band, jobs)
+
+        rows = self.rows
+        spare = self.spare
+        changes = []
+        for y in range(self.height):
+            new_row = spare[y] = int.from_bytes(buffer[area + y*stride:area + (y + 1)*stride], 'little')
+            if new_row != rows[y]:
+                changes.append((y, rows[y], new_row))
+        self.swap()
+        return changes
+
+    def close(self):
+        # stop the workers; the grid steps on one core after this
+        if self.pool:
+            self.pool.terminate()
+            self.pool.join()
+            self.memory.close()
+            self.memory.unlink()
+            self.pool = None
+        if self.threads:
+            self.stopping = True
+            for start, done in self.threads:
+                start.release()
+                done.acquire()
+            self.threads = []
@@ -0,0 +1,133 @@
+# Bit-packed Life grid for the Presto
+#
+# Each row of the board is a single int, with bit x set when cell (x, y) is
+# alive. A generation is computed a whole row at a time with bitwise adders,
+# and changes are reported a row at a time too, as the old and new row, so the
+# caller can deal with them a row at a time rather than a cell at a time.
+
+
+class BitGrid:
+    def __init__(self, width, height, born=(3,), survive=(2, 3)):
+        self.width = width
+        self.height = height
+        self.mask = (1 << width) - 1
+        self.rows = [0] * height
+        self.spare = [0] * height     # the next generation's rows, swapped in by step
+        self.set_counts(born, survive)
+
+    ### Loading and reading
+    def load(self, grid):
+        # grid is the list-of-lists form used by Life, indexed grid[x][y]
+        rows = [0] * self.height
+        for x in range(self.width):
+            column = grid[x]
+            bit = 1 << x
+            for y in range(self.height):
+                if column[y]:
+                    rows[y] |= bit
+        self.rows = rows
+
+    def cell(self, x, y):
+        return bool(self.rows[y] >> x & 1)
+
+    def population(self):
+        return sum([bin(row).count('1') for row in self.rows])
+
+    ### Rule evaluation
+    def set_counts(self, born, survive):
+        # the neighbour counts that make a cell born or survive; each count
+        # becomes a (fours/eights, ones/twos) pair of indexes into the masks
+        # next_row builds, worked out here once rather than for every row
+        self.born = born
+        self.survive = survive
+        self.born_terms = [(count >> 2, count & 3) for count in born]
+        self.survive_terms = [(count >> 2, count & 3) for count in survive]
+        self.life = list(born) == [3] and list(survive) == [2, 3]
+
+    def next_row(self, above, row, below):
+        # the next generation of a row, from the neighbour count of every
+        # cell, added up as four bit planes (1, 2, 4, 8)
+        mask = self.mask
+
+        # three cells above and below: sum of 0-3, as (twos, ones)
+        al, ar = (above << 1) & mask, above >> 1
+        a1 = al ^ above ^ ar
+        a2 = (al & above) | (ar & (al ^ above))
+        bl, br = (below << 1) & mask, below >> 1
+        b1 = bl ^ below ^ br
+        b2 = (bl & below) | (br & (bl ^ below))
+
+        # left and right in this row: sum of 0-2
+        ml, mr = (row << 1) & mask, row >> 1
+        m1 = ml ^ mr
+        m2 = ml & mr
+
+        # add the ones columns
+        ones = a1 ^ b1 ^ m1
+        carry = (a1 & b1) | (m1 & (a1 ^ b1))
+
+        # add the twos columns plus the carry from the ones
+        t = a2 ^ b2
+        t_carry = a2 & b2
+        u = m2 ^ carry
+        u_carry = m2 & carry
+        twos = t ^ u
+        v_carry = t & u
+
+        # the three carries out of the twos column, as (eights, fours)
+        fours = t_carry ^ u_carry ^ v_carry
+        eights = (t_carry & u_carry) | (v_carry & (t_carry ^ u_carry))
+
+        if self.life:
+            # B3/S23: two or three neighbours, and three unless alive
+            return twos & ~(fours | eights) & (ones | row) & mask
+
+        # a count of at most 8 is 0, 4 or 8 plus 0-3, so each count is one
+        # of three high masks and one of four low ones
+        highs = (~(fours | eights), fours, eights)
+        lows = (~(ones | twos), ones & ~twos, twos & ~ones, ones & twos)
+        born = survive = 0
+        for high, low in self.born_terms:
+            born |= highs[high] & lows[low]
+        for high, low in self.survive_terms:
+            survive |= highs[high] & lows[low]
+        return ((~row & born) | (row & survive)) & mask
+
+    def step(self):
+        # advance one generation; returns a list of (y, row, new_row) for each
+        # row that changed
+        changes = []
+        self.step_rows(0, self.height, changes)
+        self.swap()
+        return changes
+
+    def step_rows(self, start, end, changes=None):
+        # the next generation of rows start to end-1, into self.spare, adding
+        # (y, row, new_row) to changes, if given, for each row that changed;
+        # reads rows just outside the range but writes nothing outside it, so
+        # separate ranges can be stepped at the same time
+        rows = self.rows
+        height = self.height
+        next_row = self.next_row
+        born_on_empty = 0 in self.born
+
+        new_rows = self.spare
+
+        above = rows[start-1] if start else 0
+        for y in range(start, end):
+            row = rows[y]
+            below = rows[y+1] if y+1 < height else 0
+
+            if above or row or below or born_on_empty:
+                new_row = next_row(above, row, below)
+            else:
+                new_row = 0
+            new_rows[y] = new_row
+            if changes is not None and row != new_row:
+                changes.append((y, row, new_row))
+
+            above = row
+
+    def swap(self):
+        # make the rows step_rows wrote the current generation
+        self.spare, self.rows = self.rows, self.spare
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+#
+# Catalogue of the patterns in life-rles/, for picking one without loading it
+#
+# Each pattern is run once, headless, on an unbounded plane (a TileGrid, with
+# cells that fly further than MARGIN from the pattern dropped, as Life's
+# 'tiles' engine does) until it settles into a cycle. What it did is kept in
+# life-rles/catalogue.lci, which Life reads to choose patterns that fit the
+# board and settle in time. The file is b'LCI1' and a count, '<4sH', then for
+# each pattern:
+#
+#     '<20sHHIIHhhhhBB'   SHA-1 of the RLE file, width and height from its
+#                         header, initial population, generations until it
+#                         settled (UNSETTLED if it didn't), period, furthest
+#                         extent of live cells (left, top, right, bottom,
+#                         inclusive, relative to the pattern's own corner),
+#                         then lengths of the name and rule that follow
+#
+# Building again only runs patterns whose files changed, found by hash:
+#
+#     ./life_catalogue.py
+#     ./life_catalogue.py --max-generations 20000 --rebuild
+
+import os
+import struct
+
+from life_rle import read_rle
+from life_rules import totalistic
+from life_tiles import TILE, TileGrid
+
+PATTERN_DIR = 'life-rles'
+CATALOGUE_PATH = 'life-rles/catalogue.lci'
+CATALOGUE_MAGIC = b'LCI1'
+HEADER = '<4sH'
+ENTRY = '<20sHHIIHhhhhBB'
+
+UNSETTLED = 0xffffffff
+MAX_GENERATIONS = 10000
+MARGIN = 240                # as Life's PLANE_MARGIN
+EXTENT_LIMIT = 0x7fff
+
+
+### Reading, on the Presto or a computer
+def read_catalogue(path=CATALOGUE_PATH):
+    # {name: entry} for each pattern, with entries as dicts; empty if there's
+    # no catalogue yet
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return {}
+    magic, count = struct.unpack_from(HEADER, data)
+    if magic != CATALOGUE_MAGIC:
+        raise ValueError(f"{path} isn't a pattern catalogue")
+
+    entries = {}
+    offset = struct.calcsize(HEADER)
+    for _ in range(count):
+        (digest, width, height, population, settled, period,
+         left, top, right, bottom, name_length, rule_length) = struct.unpack_from(ENTRY, data, offset)
+        offset += struct.calcsize(ENTRY)
+        name = str(data[offset:offset + name_length], 'utf-8')
+        offset += name_length
+        rule = str(data[offset:offset + rule_length], 'ascii')
+        offset += rule_length
+        entries[name] = {
+            'name': name,
+            'digest': digest,
+            'width': width,
+            'height': height,
+            'rule': rule,
+            'population': population,
+            'settled': None if settled == UNSETTLED else settled,
+            'period': period,
+            'extent': (left, top, right, bottom),
+        }
+    return entries
+
+
+def fits(entry, width, height):
+    # whether the pattern stays on a width x height board all the way to
+    # settling, placed in the middle as Life places it
+    x_offset = int((width - entry['width'])/2)
+    y_offset = int((height - entry['height'])/2)
+    left, top, right, bottom = entry['extent']
+    return (0 <= left + x_offset and right + x_offset < width
+            and 0 <= top + y_offset and bottom + y_offset < height)
+
+
+def choose(entries, width, height, max_generations):
+    # names of patterns with live cells that fit the board and settle within
+    # max_generations
+    return sorted([name for name, entry in entries.items()
+                   if entry['population'] and entry['settled'] is not None and entry['settled'] <= max_generations
+                   and fits(entry, width, height)])
+
+
+### Building, on a computer
+def write_catalogue(path, entries):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(struct.pack(HEADER, CATALOGUE_MAGIC, len(entries)))
+        for name in sorted(entries):
+            entry = entries[name]
+            name = name.encode('utf-8')
+            rule = entry['rule'].encode('ascii')
+            settled = UNSETTLED if entry['settled'] is None else entry['settled']
+            extent = [max(-EXTENT_LIMIT, min(value, EXTENT_LIMIT)) for value in entry['extent']]
+            f.write(struct.pack(ENTRY, entry['digest'], entry['width'], entry['height'], entry['population'],
+                                settled, entry['period'], *extent, len(name), len(rule)))
+            f.write(name)
+            f.write(rule)
+    os.replace(path + '.tmp', path)
+
+
+def bounds(tiles):
+    # (left, top, right, bottom) of the live cells in a TileGrid, or None
+    found = None
+    for (tx, ty), rows in tiles.tiles.items():
+        for j, row in enumerate(rows):
+            if not row:
+                continue
+            x, y = tx*TILE, ty*TILE + j
+            left, right = x + (row & -row).bit_length() - 1, x + row.bit_length() - 1
+            if found is None:
+                found = [left, y, right, y]
+            else:
+                found[0] = min(found[0], left)
+                found[1] = min(found[1], y)
+                found[2] = max(found[2], right)
+                found[3] = max(found[3], y)
+    return found
+
+
+def analyse(name, text, max_generations=MAX_GENERATIONS, margin=MARGIN):
+    # run a pattern until the plane repeats; a repeat of the hash is only a
+    # candidate, confirmed by comparing the whole plane a period later
+    width, height, rule, runs = read_rle(text.splitlines())
+    runs = list(runs)
+    entry = {'name': name, 'width': width, 'height': height, 'rule': rule,
+             'settled': None, 'period': 0}
+
+    counts = totalistic(rule)
+    if not counts or 0 in counts[0]:
+        print(f"{name}: rule {rule} can't run on an unbounded plane, so it's catalogued unsettled")
+        plane = TileGrid(window=(0, 0, width, height))
+        plane.load_runs(runs)
+        entry['population'] = plane.population()
+        entry['extent'] = tuple(bounds(plane) or (0, 0, 0, 0))
+        return entry
+
+    plane = TileGrid(counts[0], counts[1], (0, 0, width, height), margin)
+    plane.load_runs(runs)
+    entry['population'] = plane.population()
+    extent = bounds(plane) or [0, 0, 0, 0]
+
+    seen = {plane.hash: 0}
+    candidate = None
+    for generation in range(1, max_generations + 1):
+        plane.step()
+        found = bounds(plane)
+        if found:
+            extent = [min(extent[0], found[0]), min(extent[1], found[1]),
+                      max(extent[2], found[2]), max(extent[3], found[3])]
+
+        if candidate:
+            tiles, first, period, confirm = candidate
+            if generation == confirm:
+                candidate = None
+                if plane.tiles == tiles:
+                    entry['settled'], entry['period'] = first, period
+                    break
+        elif plane.hash in seen:
+            first = seen[plane.hash]
+            period = generation - first
+            candidate = (plane.tiles, first, period, generation + period)
+        seen.setdefault(plane.hash, generation)
+
+    entry['extent'] = tuple(extent)
+    return entry
+
+
+def build(directory=PATTERN_DIR, path=CATALOGUE_PATH, max_generations=MAX_GENERATIONS,
+          margin=MARGIN, rebuild=False):
+    # catalogue every pattern in directory, reusing entries whose file hasn't
+    # changed (by content, so renamed files are reused too)
+    import hashlib
+
+    old = {} if rebuild else {entry['digest']: entry for entry in read_catalogue(path).values()}
+    entries = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.rle'):
+            continue
+        name = filename[:-4]
+        with open(os.path.join(directory, filename), 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha1(data).digest()
+
+        entry = old.get(digest)
+        if entry:
+            entry = dict(entry, name=name)
+        else:
+            entry = analyse(name, data.decode('utf-8'), max_generations, margin)
+            entry['digest'] = digest
+            settled = 'unsettled' if entry['settled'] is None else f"settled at {entry['settled']}, period {entry['period']}"
+            print(f"{name}: {entry['width']}x{entry['height']} {entry['rule']}, population {entry['population']}, "
+                  f"{settled}, extent {entry['extent']}")
+        entries[name] = entry
+
+    write_catalogue(path, entries)
+    return entries
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Catalogue the patterns in life-rles/")
+    parser.add_argument('--max-generations', type=int, default=MAX_GENERATIONS,
+                        help="give up on a pattern settling after this many")
+    parser.add_argument('--margin', type=int, default=MARGIN,
+                        help="drop cells this far outside the pattern; 0 keeps them all")
+    parser.add_argument('--rebuild', action='store_true', help="run every pattern again")
+    args = parser.parse_args()
+
+    entries = build(max_generations=args.max_generations, margin=args.margin, rebuild=args.rebuild)
+    print(f"{len(entries)} patterns in {CATALOGUE_PATH}")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+#
+# runs on a computer to record Life telemetry datagrams, and read them back
+#
+# A log file is b'LTL1' then one record per datagram, appended as received:
+#
+#     '<d4sH'     receive time (seconds since the epoch), sender's IPv4
+#                 address, datagram length; then the datagram itself
+#
+# Alongside each log, <log>.idx holds one '<QQdII' entry per block of about
+# INDEX_BYTES of records: start and end offsets, time of the first record,
+# and the lowest and highest generations in the block. LogReader maps the
+# log and uses the index to seek by time or generation without reading the
+# whole thing; anything after the last index entry (a writer that didn't
+# close cleanly) is indexed when the log is opened.
+#
+#     ./life_log.py life-0001.ltl --start 1700000000 --end 1700000060
+#     ./life_log.py life-*.ltl --generation 1200
+
+import argparse
+import bisect
+import mmap
+import os
+import socket
+import struct
+import time
+
+from life_telemetry import decode
+
+FILE_MAGIC = b'LTL1'
+RECORD = '<d4sH'
+INDEX = '<QQdII'
+
+INDEX_BYTES = 64 * 1024             # records per index entry, roughly
+MAX_BYTES = 256 * 1024 * 1024       # size at which the writer starts a new log
+SYNC_INTERVAL = 5                   # seconds between fsyncs
+
+NO_GENERATION = 0xffffffff
+
+
+def generations(data):
+    # (lowest, highest) generation in a datagram, or None
+    try:
+        _, events = decode(data)
+    except ValueError:
+        return None
+    found = [event['generation'] for event in events if 'generation' in event]
+    if not found:
+        return None
+    return min(found), max(found)
+
+
+class LogWriter:
+    # appends datagrams to <prefix>-0001.ltl, then -0002 and so on as each
+    # reaches max_bytes
+    def __init__(self, prefix, max_bytes=MAX_BYTES, sync_interval=SYNC_INTERVAL):
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.sync_interval = sync_interval
+        self.number = 0
+        self.file = None
+        self.open_next()
+
+    def open_next(self):
+        if self.file:
+            self.close()
+        self.number += 1
+        while os.path.exists(f'{self.prefix}-{self.number:04d}.ltl'):
+            self.number += 1
+        self.path = f'{self.prefix}-{self.number:04d}.ltl'
+
+        self.file = open(self.path, 'wb')
+        self.index = open(self.path + '.idx', 'wb')
+        self.file.write(FILE_MAGIC)
+        self.size = len(FILE_MAGIC)
+        self.block = None
+        self.last_sync = time.time()
+
+    def write(self, data, address, received=None):
+        if received is None:
+            received = time.time()
+        length = struct.calcsize(RECORD) + len(data)
+        if self.size + length > self.max_bytes and self.size > len(FILE_MAGIC):
+            self.open_next()
+
+        if self.block is None:
+            self.block = [self.size, received, NO_GENERATION, 0]
+        found = generations(data)
+        if found:
+            self.block[2] = min(self.block[2], found[0])
+            self.block[3] = max(self.block[3], found[1])
+
+        self.file.write(struct.pack(RECORD, received, socket.inet_aton(address), len(data)))
+        self.file.write(data)
+        self.size += length
+
+        if self.size - self.block[0] >= INDEX_BYTES:
+            self.end_block()
+        if received - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def end_block(self):
+        if self.block is None:
+            return
+        start, first_time, lowest, highest = self.block
+        self.index.write(struct.pack(INDEX, start, self.size, first_time, lowest, highest))
+        self.block = None
+
+    def sync(self):
+        # only whole blocks are indexed, so the index never points past the log
+        for f in (self.file, self.index):
+            f.flush()
+            os.fsync(f.fileno())
+        self.last_sync = time.time()
+
+    def close(self):
+        self.end_block()
+        self.sync()
+        self.file.close()
+        self.index.close()
+        self.file = None
+
+
+class LogReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(FILE_MAGIC)] != FILE_MAGIC:
+            raise ValueError(f"{path} isn't a Life telemetry log")
+
+        # index entries as (start, end, time, lowest, highest)
+        self.blocks = []
+        try:
+            with open(path + '.idx', 'rb') as f:
+                index = f.read()
+            usable = len(index) - len(index) % struct.calcsize(INDEX)
+            self.blocks = [block for block in struct.iter_unpack(INDEX, index[:usable]) if block[1] <= len(self.map)]
+        except OSError:
+            pass
+        self.index_tail(self.blocks[-1][1] if self.blocks else len(FILE_MAGIC))
+        self.times = [block[2] for block in self.blocks]
+
+    def index_tail(self, offset):
+        # index whatever the writer didn't, from offset to the end
+        block = None
+        for received, address, data, end in self.read(offset):
+            if block is None:
+                block = [offset, end, received, NO_GENERATION, 0]
+            found = generations(data)
+            if found:
+                block[3] = min(block[3], found[0])
+                block[4] = max(block[4], found[1])
+            block[1] = offset = end
+            if end - block[0] >= INDEX_BYTES:
+                self.blocks.append(tuple(block))
+                block = None
+        if block:
+            self.blocks.append(tuple(block))
+
+    def read(self, offset, end=None):
+        # (time, address, datagram, next offset) from offset, stopping at end
+        # or at a record cut short
+        header = struct.calcsize(RECORD)
+        end = len(self.map) if end is None else end
+        while offset + header <= end:
+            received, address, length = struct.unpack_from(RECORD, self.map, offset)
+            if offset + header + length > len(self.map):
+                return
+            data = self.map[offset + header:offset + header + length]
+            offset += header + length
+            yield received, socket.inet_ntoa(address), data, offset
+
+    def records(self, start=None, end=None):
+        # (time, address, datagram) for records received from start to end
+        offset = len(FILE_MAGIC)
+        if start is not None and self.blocks:
+            block = max(bisect.bisect_right(self.times, start) - 1, 0)
+            offset = self.blocks[block][0]
+        for received, address, data, _ in self.read(offset):
+            if end is not None and received > end:
+                return
+            if start is None or received >= start:
+                yield received, address, data
+
+    def at_generation(self, generation):
+        # (time, address, datagram) for records with events for generation,
+        # reading only blocks whose range covers it
+        for start, end, _, lowest, highest in self.blocks:
+            if not lowest <= generation <= highest:
+                continue
+            for received, address, data, _ in self.read(start, end):
+                found = generations(data)
+                if found and found[0] <= generation <= found[1]:
+                    yield received, address, data
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the events in Life telemetry logs")
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--start', type=float, help="earliest receive time, in seconds since the epoch")
+    parser.add_argument('--end', type=float, help="latest receive time, in seconds since the epoch")
+    parser.add_argument('--generation', type=int, help="only datagrams with events for this generation")
+    args = parser.parse_args()
+
+    for path in args.logs:
+        reader = LogReader(path)
+        if args.generation is not None:
+            records = reader.at_generation(args.generation)
+        else:
+            records = reader.records(args.start, args.end)
+        for received, address, data in records:
+            sequence, events = decode(data)
+            for event in events:
+                if args.generation is None or event.get('generation') == args.generation:
+                    print(f"{received:.3f} {address} {sequence} {event}")
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
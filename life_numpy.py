@@ -0,0 +1,129 @@
+# Vectorised Life grid, for NumPy on a computer or ulab on the Presto
+#
+# The board is a 2D uint8 array indexed [x, y], like Life's grid[x][y].
+# Totalistic rules count every cell's neighbours at once, as shifted sums of
+# a zero-padded copy, and pick the cells born or surviving from the counts;
+# other rules build every cell's 9-bit neighbourhood mask the same way and
+# look the whole board up in the rule table. Either way there's no per-cell
+# Python work, except for changes that are drawn or streamed.
+#
+# The hash is kept by the array too. With NumPy it's Life's Zobrist hash,
+# the XOR of the keys of live cells, updated by XORing together the keys of
+# the cells that changed. ulab (the Presto's numpy subset) has no XOR
+# reduction, nor the integer array indexing the rule table lookup needs, so
+# there the hash is the sum of live cells' keys instead, worked out again
+# each generation, and only totalistic rules run.
+
+try:
+    import numpy as np
+    ULAB = False
+except ImportError:
+    from ulab import numpy as np
+    ULAB = True
+
+from life_rules import DEFAULT_RULE, compile_rule, totalistic
+
+# (dx, dy, bit) for each cell of the neighbourhood, in life_rules' layout
+OFFSETS = [(dx, dy, 1 << ((dy+1)*3 + dx+1)) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+
+
+class ArrayGrid:
+    def __init__(self, width, height, rule=DEFAULT_RULE, keys=None):
+        # keys are the Zobrist keys Life hashes with, indexed x*height + y
+        self.width = width
+        self.height = height
+        counts = totalistic(rule)
+        if counts:
+            self.born, self.survive = counts
+            self.table = None
+        elif ULAB:
+            raise ValueError(f"ulab can only run totalistic rules, not {rule}")
+        else:
+            self.born = self.survive = None
+            self.table = np.array(compile_rule(rule), dtype=np.uint8)
+        self.grid = np.zeros((width, height), dtype=np.uint8)
+        self.padded = np.zeros((width+2, height+2), dtype=np.uint8)
+
+        if keys is None:
+            keys = [0] * (width * height)
+        keys = np.array(keys, dtype=np.float if ULAB else np.int64)
+        self.keys = keys.reshape((width, height))
+        self.hash = 0
+
+    ### Loading and reading
+    def load(self, grid):
+        # grid is the list-of-lists form used by Life, indexed grid[x][y]
+        self.grid = np.array(grid, dtype=np.uint8)
+        self.hash = 0
+        self.rehash(self.grid)
+
+    def rehash(self, changed):
+        if ULAB:
+            self.hash = np.sum(self.keys * self.grid)
+        else:
+            self.hash ^= int(np.bitwise_xor.reduce(self.keys[changed != 0]))
+
+    def cell(self, x, y):
+        return bool(self.grid[x, y])
+
+    def population(self):
+        return int(np.sum(self.grid))
+
+    def row_population(self):
+        # live cells in each row, as a list
+        return [int(count) for count in np.sum(self.grid, axis=0)]
+
+    def snapshot(self):
+        # something cheap to compare with ==, for cycle detection
+        return self.grid.tobytes()
+
+    ### Rule evaluation
+    def neighbours(self):
+        # every cell's live neighbour count
+        width, height = self.width, self.height
+        padded = self.padded
+        padded[1:width+1, 1:height+1] = self.grid
+
+        counts = np.zeros((width, height), dtype=np.uint8)
+        for dx, dy, _ in OFFSETS:
+            if dx or dy:
+                counts += padded[1+dx:width+1+dx, 1+dy:height+1+dy]
+        return counts
+
+    def matches(self, counts, values):
+        # 1 where counts is one of values, else 0
+        result = np.zeros((self.width, self.height), dtype=np.uint8)
+        for value in values:
+            result += counts == value
+        return result
+
+    def neighbourhoods(self):
+        # every cell's 3x3 neighbourhood as a mask for the rule table
+        width, height = self.width, self.height
+        padded = self.padded
+        padded[1:width+1, 1:height+1] = self.grid
+
+        masks = np.zeros((width, height), dtype=np.uint16)
+        for dx, dy, bit in OFFSETS:
+            masks += padded[1+dx:width+1+dx, 1+dy:height+1+dy] * np.uint16(bit)
+        return masks
+
+    def step(self):
+        # advance one generation; returns the changed-cell mask (new ^ old)
+        old = self.grid
+        if self.table is None:
+            counts = self.neighbours()
+            self.grid = (self.matches(counts, self.born) * (1 - old)
+                         + self.matches(counts, self.survive) * old)
+        else:
+            self.grid = self.table[self.neighbourhoods()]
+        changed = self.grid ^ old
+        self.rehash(changed)
+        return changed
+
+    def changes(self, changed):
+        # (x, y, state) for each cell set in a changed-cell mask
+        xs, ys = np.nonzero(changed)
+        grid = self.grid
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            yield (x, y, bool(grid[x, y]))
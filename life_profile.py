@@ -0,0 +1,108 @@
+# Per-phase timing and heap use for Life's app loop
+#
+# Each generation is split into phases by calling mark() as each one ends.
+# Timings go into fixed-size ring buffers (one array per phase), so nothing
+# is allocated while timing; summary() works out min/mean/max on demand.
+# MemoryProfiler does the same for bytes allocated per generation.
+
+import time
+from array import array
+
+try:
+    from gc import mem_alloc
+except ImportError:
+    # CPython: traced allocations stand in for MicroPython's heap
+    import tracemalloc
+
+    def mem_alloc():
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.get_traced_memory()[0]
+
+PHASES = ('step', 'draw', 'flush', 'cycles', 'telemetry')
+# Life steps and draws in separate tasks, timed by a profiler each: every
+# generation, and every frame
+STEP_PHASES = ('step', 'cycles', 'telemetry')
+FRAME_PHASES = ('draw', 'flush')
+
+
+class PhaseProfiler:
+    def __init__(self, size=64, phases=PHASES):
+        self.size = size
+        self.phases = phases
+        self.samples = [array('l', [0] * size) for _ in phases]
+        self.index = 0
+        self.count = 0
+        self.phase = 0
+        self.last = 0
+
+    def start(self):
+        self.phase = 0
+        self.last = time.ticks_us()
+
+    def mark(self):
+        # end the current phase and start the next
+        now = time.ticks_us()
+        self.samples[self.phase][self.index] = time.ticks_diff(now, self.last)
+        self.last = now
+        self.phase += 1
+
+    def end(self):
+        # finish a generation; returns True each time the ring buffers fill
+        self.index += 1
+        if self.count < self.size:
+            self.count += 1
+        if self.index == self.size:
+            self.index = 0
+            return True
+        return False
+
+    def summary(self):
+        # {phase: [min, mean, max]} in microseconds, over the last size generations
+        summary = {}
+        for name, samples in zip(self.phases, self.samples):
+            values = samples[:self.count]
+            if values:
+                summary[name] = [min(values), sum(values) // len(values), max(values)]
+        return summary
+
+
+class MemoryProfiler:
+    # heap bytes allocated in each generation, from gc.mem_alloc() before
+    # and after it; when the heap shrinks instead, a collection ran during
+    # the generation, and that's counted rather than the bytes
+    def __init__(self, size=64):
+        self.size = size
+        self.samples = array('l', [0] * size)
+        self.index = 0
+        self.count = 0
+        self.collections = 0
+        self.before = 0
+
+    def start(self):
+        self.before = mem_alloc()
+
+    def end(self):
+        # finish a generation; returns True each time the ring buffer fills
+        allocated = mem_alloc() - self.before
+        if allocated < 0:
+            self.collections += 1
+            allocated = 0
+        self.samples[self.index] = allocated
+        self.index += 1
+        if self.count < self.size:
+            self.count += 1
+        if self.index == self.size:
+            self.index = 0
+            return True
+        return False
+
+    def summary(self):
+        # (mean, max) bytes allocated per generation over the last size
+        # generations, and collections since the last summary
+        values = self.samples[:self.count]
+        collections = self.collections
+        self.collections = 0
+        if not values:
+            return 0, 0, collections
+        return sum(values) // len(values), max(values), collections
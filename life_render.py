@@ -0,0 +1,196 @@
+# Batched drawing of Life cells on the Presto
+#
+# Changed cells are collected until the next flush and drawn together:
+# grouped by state, merged into horizontal runs within each row, and drawn
+# with one rectangle per run using pens created once up front. Only the last
+# state of each cell is kept, so when several generations go by between
+# frames, a cell that flipped in more than one is still drawn once.
+# FramebufferRenderer does the same, but with slice writes straight into the
+# RGB565 framebuffer.
+
+
+def runs(changes, merge=True):
+    # (x, y, length, state) for each run of adjacent cells with the same
+    # state in one row; changes is a list of (state, y, x), sorted in place
+    changes.sort()
+
+    run = None
+    for state, y, x in changes:
+        if run and merge and y == run[1] and x == run[0] + run[2] and state == run[3]:
+            run[2] += 1
+            continue
+        if run:
+            yield run
+        run = [x, y, 1, state]
+    if run:
+        yield run
+
+
+def row_changes(changes, y, row, new_row):
+    # add each cell that differs between two versions of a BitGrid row to a
+    # dict of changes keyed y << 16 | x
+    diff = row ^ new_row
+    key = y << 16
+    while diff:
+        if not diff & 0xff:
+            diff >>= 8
+            key += 8
+            continue
+        if diff & 1:
+            changes[key] = bool(new_row >> (key & 0xffff) & 1)
+        diff >>= 1
+        key += 1
+
+
+def pending(changes):
+    # (state, y, x) for each cell in a dict of changes keyed y << 16 | x
+    return [(state, key >> 16, key & 0xffff) for key, state in changes.items()]
+
+
+class RunRenderer:
+    def __init__(self, display, cell=3, gap=1):
+        self.display = display
+        self.cell = cell
+        self.gap = gap
+
+        self.background = display.create_pen(0, 0, 0)
+        self.pens = {
+            True: display.create_pen(255, 255, 255),
+            False: display.create_pen(51, 51, 51),
+        }
+        self.changes = {}
+
+    def clear(self):
+        self.changes.clear()
+        self.display.set_pen(self.background)
+        self.display.clear()
+
+    def add(self, x, y, state):
+        self.changes[y << 16 | x] = state
+
+    def add_row(self, y, row, new_row):
+        row_changes(self.changes, y, row, new_row)
+
+    def flush(self):
+        # draw everything added since the last flush; returns the dirty
+        # rectangle in pixels as (x, y, w, h), or None if nothing changed
+        if not self.changes:
+            return None
+
+        display = self.display
+        cell = self.cell
+        size = cell - self.gap
+
+        pen = None
+        left = top = 1 << 30
+        right = bottom = 0
+        # with a gap between cells, every cell is its own run
+        for x, y, length, state in runs(pending(self.changes), merge=not self.gap):
+            if state is not pen:
+                display.set_pen(self.pens[state])
+                pen = state
+            px, py = x*cell, y*cell
+            display.rectangle(px, py, length*cell - self.gap, size)
+
+            left = min(left, px)
+            top = min(top, py)
+            right = max(right, px + length*cell)
+            bottom = max(bottom, py + cell)
+
+        self.changes.clear()
+        return (left, top, right - left, bottom - top)
+
+
+def rgb565(r, g, b):
+    # two bytes in the order PicoGraphics keeps them in the framebuffer (byte-swapped)
+    value = ((r & 0b11111000) << 8) | ((g & 0b11111100) << 3) | (b >> 3)
+    return bytes((value >> 8, value & 0xff))
+
+
+class FramebufferRenderer:
+    # Same interface as RunRenderer, but writes straight into an RGB565
+    # framebuffer (memoryview(display) on the Presto, or any bytearray)
+    def __init__(self, buffer, width, height, cell=3, gap=1):
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+        self.stride = width * 2
+        self.cell = cell
+        self.gap = gap
+
+        self.background = rgb565(0, 0, 0)
+        self.colours = {
+            True: rgb565(255, 255, 255),
+            False: rgb565(51, 51, 51),
+        }
+        # one pixel row of a run of cells, by (state, length)
+        self.patterns = {}
+        self.changes = {}
+
+    def clear(self):
+        self.changes.clear()
+        row = self.background * self.width
+        for y in range(self.height):
+            self.buffer[y*self.stride:(y+1)*self.stride] = row
+
+    def add(self, x, y, state):
+        self.changes[y << 16 | x] = state
+
+    def add_row(self, y, row, new_row):
+        row_changes(self.changes, y, row, new_row)
+
+    def pattern(self, state, length):
+        key = (state, length)
+        pattern = self.patterns.get(key)
+        if pattern is None:
+            block = self.colours[state] * (self.cell - self.gap) + self.background * self.gap
+            pattern = block * length
+            self.patterns[key] = pattern
+        return pattern
+
+    def flush(self):
+        # write everything added since the last flush; returns the dirty
+        # rectangle in pixels as (x, y, w, h), or None if nothing changed
+        if not self.changes:
+            return None
+
+        buffer = self.buffer
+        stride = self.stride
+        cell = self.cell
+        size = cell - self.gap
+
+        left = top = 1 << 30
+        right = bottom = 0
+        # gaps are written as background, so runs can always merge
+        for x, y, length, state in runs(pending(self.changes)):
+            pattern = self.pattern(state, length)
+            px, py = x*cell, y*cell
+            start = py*stride + px*2
+            end = start + len(pattern)
+            for _ in range(size):
+                buffer[start:end] = pattern
+                start += stride
+                end += stride
+
+            left = min(left, px)
+            top = min(top, py)
+            right = max(right, px + length*cell)
+            bottom = max(bottom, py + cell)
+
+        self.changes.clear()
+        return (left, top, right - left, bottom - top)
+
+
+class NullRenderer:
+    # for headless runs: changes are dropped and nothing is ever dirty
+    def clear(self):
+        pass
+
+    def add(self, x, y, state):
+        pass
+
+    def add_row(self, y, row, new_row):
+        pass
+
+    def flush(self):
+        return None
@@ -0,0 +1,194 @@
+# Streaming RLE pattern reader
+#
+# Reads a pattern a line at a time and yields runs of live cells as it goes,
+# so even large patterns load in one pass without holding the file in memory.
+# See https://conwaylife.com/wiki/Run_Length_Encoded
+#
+# load_pattern also keeps a packed binary copy of each pattern in a cache
+# directory, so after the first load a pattern is a single read.
+
+import os
+import re
+import struct
+
+from life_rules import DEFAULT_RULE
+
+HEADER_PATTERN = re.compile(r'x\s*=\s*(\d+).*?y\s*=\s*(\d+)')
+RULE_PATTERN = re.compile(r'rule\s*=\s*([^\s,]+)')
+
+PATTERN_DIR = 'life-rles'
+CACHE_DIR = 'life-rles/cache'
+# magic, source mtime, width and height from the RLE header, columns and
+# rows actually packed (patterns can overrun their header), rule length;
+# then the rule, then (columns+7)//8 bytes per row, lowest bit first
+CACHE_MAGIC = b'LRC1'
+CACHE_HEADER = '<4sIHHHHB'
+
+
+def read_rle(lines):
+    # lines is any iterable of lines, such as an open file; returns
+    # (width, height, rule, runs) with runs a generator of (x, y, length)
+    lines = iter(lines)
+    for line in lines:
+        line = line.strip()
+        if line and line[0] != '#':
+            break
+    else:
+        raise ValueError("No RLE header found")
+
+    header = HEADER_PATTERN.search(line)
+    if not header:
+        raise ValueError(f"Can't parse RLE header '{line}'")
+    width = int(header.group(1))
+    height = int(header.group(2))
+
+    rule = RULE_PATTERN.search(line)
+    if rule:
+        rule = rule.group(1)
+    else:
+        print(f"No or improper rule in file; defaulting to {DEFAULT_RULE}.")
+        rule = DEFAULT_RULE
+
+    return width, height, rule, live_runs(lines)
+
+
+def tokens(lines):
+    # (count, tag) for each run in the pattern body, up to the closing '!'
+    count = 0
+    prefix = ''
+    for line in lines:
+        if line[:1] == '#':
+            continue
+        for char in line:
+            if '0' <= char <= '9':
+                count = count*10 + ord(char) - 48
+            elif char in ' \t\r\n':
+                continue
+            elif 'p' <= char <= 'y':
+                # first half of a multi-state tag, such as 'pA'
+                prefix = char
+            else:
+                yield (count or 1, prefix + char)
+                if char == '!':
+                    return
+                count = 0
+                prefix = ''
+
+
+def live_runs(lines):
+    # (x, y, length) for each horizontal run of live cells; any state other
+    # than 'b' or '.' counts as alive
+    x = y = 0
+    for count, tag in tokens(lines):
+        if tag == '$':
+            x = 0
+            y += count
+        elif tag == '!':
+            return
+        elif tag == 'b' or tag == '.':
+            x += count
+        else:
+            yield (x, y, count)
+            x += count
+
+
+### Binary pattern cache
+def pack_rows(runs):
+    # live runs into (columns, rows, data), with data as packed rows
+    rows = []
+    columns = 0
+    for x, y, length in runs:
+        while len(rows) <= y:
+            rows.append(0)
+        rows[y] |= ((1 << length) - 1) << x
+        columns = max(columns, x + length)
+    stride = (columns + 7) // 8
+    return columns, len(rows), b''.join([row.to_bytes(stride, 'little') for row in rows])
+
+
+def packed_runs(data, offset, columns, rows):
+    # (x, y, length) live runs from packed rows starting at data[offset]
+    stride = (columns + 7) // 8
+    for y in range(rows):
+        row = int.from_bytes(data[offset + y*stride:offset + (y+1)*stride], 'little')
+        x = 0
+        while row:
+            if not row & 1:
+                row >>= 1
+                x += 1
+                continue
+            length = 0
+            while row & 1:
+                row >>= 1
+                length += 1
+            yield (x, y, length)
+            x += length
+
+
+def read_cache(data, mtime):
+    # (width, height, rule, runs) from a cache file, or None if it's stale
+    # or cut short
+    if len(data) < struct.calcsize(CACHE_HEADER):
+        return None
+    magic, cached_mtime, width, height, columns, rows, rule_length = struct.unpack_from(CACHE_HEADER, data)
+    if magic != CACHE_MAGIC or cached_mtime != mtime:
+        return None
+    offset = struct.calcsize(CACHE_HEADER)
+    rule = str(data[offset:offset + rule_length], 'ascii')
+    offset += rule_length
+    if len(data) != offset + rows * ((columns + 7) // 8):
+        return None
+    return width, height, rule, packed_runs(data, offset, columns, rows)
+
+
+def write_cache(path, mtime, width, height, rule, packed):
+    # written alongside and then renamed, so a write that's interrupted
+    # never leaves a partial cache in place (rename, since MicroPython's os
+    # has no replace; it overwrites on littlefs as on POSIX)
+    columns, rows, data = packed
+    rule = rule.encode('ascii')
+    with open(path + '.tmp', 'wb') as f:
+        f.write(struct.pack(CACHE_HEADER, CACHE_MAGIC, mtime, width, height, columns, rows, len(rule)))
+        f.write(rule)
+        f.write(data)
+    os.rename(path + '.tmp', path)
+
+
+def load_pattern(name, directory=PATTERN_DIR, cache_dir=CACHE_DIR):
+    # (width, height, rule, runs) for life-rles/<name>.rle, from the cache
+    # when it was written for the same mtime, otherwise parsed and cached
+    source = f'{directory}/{name}.rle'
+    cache = f'{cache_dir}/{name}.lrc'
+    mtime = os.stat(source)[8] & 0xffffffff
+
+    try:
+        with open(cache, 'rb') as f:
+            pattern = read_cache(f.read(), mtime)
+        if pattern:
+            return pattern
+    except (OSError, ValueError):
+        pass
+
+    with open(source) as f:
+        width, height, rule, runs = read_rle(f)
+        packed = pack_rows(runs)
+
+    try:
+        try:
+            os.mkdir(cache_dir)
+        except OSError:
+            pass
+        write_cache(cache, mtime, width, height, rule, packed)
+    except OSError as e:
+        print(f"Couldn't write pattern cache {cache}: {e}")
+
+    columns, rows, data = packed
+    return width, height, rule, packed_runs(data, 0, columns, rows)
+
+
+if __name__ == "__main__":
+    # convert every pattern up front
+    for filename in sorted(os.listdir(PATTERN_DIR)):
+        if filename.endswith('.rle'):
+            width, height, rule, runs = load_pattern(filename[:-4])
+            print(f"{filename}: {width}x{height} {rule}")
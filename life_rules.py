@@ -0,0 +1,140 @@
+# Life-like rules, including isotropic non-totalistic (Hensel) rules
+#
+# A rule is compiled into a 512-entry transition table indexed by the 3x3
+# neighbourhood as a 9-bit mask, using Golly's layout (the cell itself is 16):
+#
+#     1   2   4
+#     8  16  32
+#    64 128 256
+#
+# so the next state of any cell is a single lookup: table[neighbourhood].
+
+DEFAULT_RULE = 'B3/S23'
+
+CENTRE = 16
+NEIGHBOURS = 511 ^ CENTRE
+
+# Hensel letters for 1-4 neighbours, with one example neighbourhood for each
+# (as in Golly); every other neighbourhood is a rotation or reflection of one
+# of these, and 5-7 neighbours use the letter of their complement
+LETTERS = {
+    1: ('ce', (1, 2)),
+    2: ('ceaikn', (5, 10, 3, 40, 33, 68)),
+    3: ('ceaiknjqry', (69, 42, 11, 7, 98, 13, 14, 70, 41, 97)),
+    4: ('ceaiknjqrytwz', (325, 170, 15, 45, 99, 71, 106, 102, 43, 101, 105, 78, 108)),
+}
+
+
+def transform(mask, rotate, reflect):
+    result = 0
+    for i in range(9):
+        if mask >> i & 1:
+            row, col = i // 3, i % 3
+            for _ in range(rotate):
+                row, col = col, 2 - row
+            if reflect:
+                col = 2 - col
+            result |= 1 << (row*3 + col)
+    return result
+
+
+def count(mask):
+    return bin(mask & NEIGHBOURS).count('1')
+
+
+def build_letters():
+    # Hensel letter of every neighbourhood (ignoring the centre bit)
+    letters = {}
+    for n, (names, examples) in LETTERS.items():
+        for letter, example in zip(names, examples):
+            for rotate in range(4):
+                for reflect in (False, True):
+                    letters[transform(example, rotate, reflect)] = letter
+    for mask in range(512):
+        if mask & CENTRE or mask in letters:
+            continue
+        if count(mask) > 4:
+            letters[mask] = letters.get(mask ^ NEIGHBOURS, '')
+        else:
+            letters[mask] = ''
+    return letters
+
+
+def parse_conditions(text):
+    # '2-a3ce4' -> {2: all but 2a, 3: 3c and 3e, 4: all}, as sets of letters
+    # (None meaning every neighbourhood with that count)
+    conditions = {}
+    n = None
+    negate = False
+    for char in text:
+        if char in '012345678':
+            n = int(char)
+            negate = False
+            conditions[n] = None
+        elif char == '-' and n is not None and conditions[n] is None:
+            negate = True
+            conditions[n] = set(LETTERS[n][0]) if n in LETTERS else set()
+        elif n in LETTERS and char in LETTERS[n][0]:
+            if negate:
+                conditions[n].discard(char)
+            else:
+                if conditions[n] is None:
+                    conditions[n] = set()
+                conditions[n].add(char)
+        else:
+            raise ValueError(f"Can't parse '{char}' in rule conditions '{text}'")
+    return conditions
+
+
+def parse_rule(rule):
+    # 'B3/S23', 'b36/s23', 'B2-a/S12' or the older '23/3' (survive/born);
+    # a bounded grid suffix such as ':T80,80' is ignored
+    parts = rule.strip().split(':')[0].split('/')
+    if len(parts) != 2:
+        raise ValueError(f"Can't parse rule '{rule}'")
+
+    born = survive = None
+    for part in parts:
+        if part and part[0] in 'Bb':
+            born = parse_conditions(part[1:])
+        elif part and part[0] in 'Ss':
+            survive = parse_conditions(part[1:])
+    if born is None and survive is None:
+        survive, born = parse_conditions(parts[0]), parse_conditions(parts[1])
+    if born is None or survive is None:
+        raise ValueError(f"Can't parse rule '{rule}'")
+    return born, survive
+
+
+def matches(conditions, n, letter):
+    if n not in conditions:
+        return False
+    letters = conditions[n]
+    return letters is None or letter in letters
+
+
+def compile_rule(rule=DEFAULT_RULE):
+    born, survive = parse_rule(rule)
+    letters = build_letters()
+
+    table = bytearray(512)
+    for mask in range(512):
+        neighbourhood = mask & NEIGHBOURS
+        n = count(neighbourhood)
+        letter = letters[neighbourhood]
+        if mask & CENTRE:
+            table[mask] = 1 if matches(survive, n, letter) else 0
+        else:
+            table[mask] = 1 if matches(born, n, letter) else 0
+    return table
+
+
+def totalistic(rule=DEFAULT_RULE):
+    # (born, survive) neighbour counts for engines that only count
+    # neighbours, or None if the rule depends on the arrangement too
+    born, survive = parse_rule(rule)
+    for conditions in (born, survive):
+        for n, letters in conditions.items():
+            if letters is not None and letters != set(LETTERS[n][0]):
+                return None
+    return sorted(born), sorted(survive)
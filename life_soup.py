@@ -0,0 +1,98 @@
+# Seeded random soups, generated as packed rows
+#
+# The generator is xorshift32, so a seed gives the same soup on the Presto as
+# on a computer (random's generator differs between MicroPython and CPython).
+# Cells are decided 32 at a time: each gets an 8-bit random value, one bit
+# from each of eight words, which is compared with chance*256 for all 32 at
+# once with bitwise operations. Rows are ints with bit x set when cell (x, y)
+# is alive, as in BitGrid; mirrored rows are made by reversing bits a byte at
+# a time.
+
+PRECISION = 8
+WORD = 0xffffffff
+
+# bits of each byte in reverse order
+REVERSED = bytes([sum([(i >> bit & 1) << (7 - bit) for bit in range(8)]) for i in range(256)])
+
+
+class Random:
+    def __init__(self, seed):
+        # spread nearby seeds apart, and never start from 0
+        self.state = (seed * 0x9e3779b1 + 0x7f4a7c15) & WORD or 0x6d2b79f5
+        for _ in range(4):
+            self.word()
+
+    def word(self):
+        x = self.state
+        x ^= (x << 13) & WORD
+        x ^= x >> 17
+        x ^= (x << 5) & WORD
+        self.state = x
+        return x
+
+    def bits(self, count, chance):
+        # an int of count bits, each set with probability chance (to within
+        # 1/256); planes below the threshold's lowest set bit can't change
+        # the comparison, so no words are drawn for them
+        threshold = min(int(chance * (1 << PRECISION) + 0.5), (1 << PRECISION) - 1)
+        if not threshold or count <= 0:
+            return 0
+        low = 0
+        while not threshold >> low & 1:
+            low += 1
+
+        value = 0
+        for shift in range(0, count, 32):
+            less = 0
+            for plane in range(low, PRECISION):
+                word = self.word()
+                if threshold >> plane & 1:
+                    less = (~word & WORD) | less
+                else:
+                    less = ~word & less
+            value |= less << shift
+        return value & ((1 << count) - 1)
+
+
+def reverse(value, width):
+    # value's lowest width bits in reverse order
+    length = (width + 7) // 8
+    result = 0
+    for byte in value.to_bytes(length, 'little'):
+        result = result << 8 | REVERSED[byte]
+    return result >> (length*8 - width)
+
+
+def soup(width, height, seed, chance=0.2, border=0):
+    # rows of random cells, with an empty border to give it room to grow
+    random = Random(seed)
+    rows = [0] * height
+    for y in range(border, height - border):
+        rows[y] = random.bits(width - 2*border, chance) << border
+    return rows
+
+
+def kaleidosoup(width, height, seed, chance=0.2, border=0):
+    # a quarter of soup, mirrored left to right and top to bottom
+    random = Random(seed)
+    rows = [0] * height
+    for y in range(border, height // 2):
+        left = random.bits(width//2 - border, chance) << border
+        rows[y] = rows[height - y - 1] = left | reverse(left, width)
+    return rows
+
+
+def unpack(rows, width, height):
+    # rows into the list-of-lists form used by Life, indexed grid[x][y]
+    grid = [[False for _ in range(height)] for _ in range(width)]
+    length = (width + 7) // 8
+    for y, row in enumerate(rows):
+        if not row:
+            continue
+        for i, byte in enumerate(row.to_bytes(length, 'little')):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte >> bit & 1:
+                    grid[i*8 + bit][y] = True
+    return grid
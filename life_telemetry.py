@@ -0,0 +1,487 @@
+# Binary telemetry for Life's multicast events
+#
+# Each datagram is a small header followed by one or more fixed-layout
+# records, all little-endian:
+#
+#     header      '<2sBBI'  b'LT', version, number of records, sequence
+#     start       '<B'      type 0
+#     generation  '<BIfi'   type 1, generation, fps, alive (-1 if not counted)
+#     steady      '<BIhhI'  type 2, generation, cycle index, matched (-1 if
+#                           none), period
+#     profile     '<BIB'    type 3, generation, number of phases, followed by
+#                 '<III'    min, mean, max microseconds for each phase
+#     frame       '<BIHHHH' type 4, generation, board width and height, first
+#                           column, number of columns, followed by the
+#                           columns' cells packed (height+7)//8 bytes each,
+#                           lowest bit first
+#     delta       '<BIH'    type 5, generation, number of runs, followed by
+#                 '<HHB'    x, y, length for each horizontal run of cells that
+#                           flipped since the last delta, up to generation
+#                           (vertical runs, one generation's, in version 1)
+#     seed        '<BIBfBHH' type 6, seed, kind (index into SOUPS), chance,
+#                           border, board width and height: enough for
+#                           life_soup to make the same soup again
+#     memory      '<BIIIH'  type 7, generation, mean and max heap bytes
+#                           allocated per generation, collections
+#
+# Generation records are batched, and datagrams are sent at most RATE times a
+# second; the sequence number goes up by one per datagram so listeners can
+# spot lost ones. Anything that starts with '{' is the older JSON format.
+#
+# Frames and deltas, from Stream, let a listener mirror the board. Flips are
+# gathered between sends, which go with the generation records' (so at most
+# RATE a second), as deltas or, when the runs would take more room than the
+# board itself, a whole frame; a few columns are refreshed from frames each
+# time round too, so a listener that joins late or misses a datagram catches
+# up.
+
+import json
+import struct
+import time
+
+from life_profile import PHASES
+
+MAGIC = b'LT'
+VERSION = 2
+
+HEADER = '<2sBBI'
+START = '<B'
+GENERATION = '<BIfi'
+STEADY = '<BIhhI'
+PROFILE = '<BIB'
+PHASE = '<III'
+FRAME = '<BIHHHH'
+DELTA = '<BIH'
+RUN = '<HHB'
+SEED = '<BIBfBHH'
+MEMORY = '<BIIIH'
+
+TYPE_START = 0
+TYPE_GENERATION = 1
+TYPE_STEADY = 2
+TYPE_PROFILE = 3
+TYPE_FRAME = 4
+TYPE_DELTA = 5
+TYPE_SEED = 6
+TYPE_MEMORY = 7
+
+SOUPS = ('soup', 'kaleidosoup')
+
+BATCH = 16      # generation records per datagram
+RATE = 5        # datagrams per second, at most
+COLUMNS = 8     # board columns refreshed with each send when streaming
+MAX_DATAGRAM = 1400
+
+
+class Telemetry:
+    def __init__(self, socket, address, batch=BATCH, rate=RATE):
+        self.socket = socket
+        self.address = address
+        self.batch = batch
+        self.interval = 1000 // rate if rate else 0
+
+        # room for a full batch plus one of each of the other records
+        size = (struct.calcsize(HEADER) + batch * struct.calcsize(GENERATION) +
+                struct.calcsize(STEADY) + struct.calcsize(PROFILE) + len(PHASES) * struct.calcsize(PHASE) + 1)
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.offset = struct.calcsize(HEADER)
+        self.records = 0
+        self.generations = 0
+        self.sequence = 0
+        self.last_send = time.ticks_ms()
+        self.dropped = 0
+
+    ### Records
+    def start(self):
+        struct.pack_into(START, self.buffer, self.offset, TYPE_START)
+        self.offset += struct.calcsize(START)
+        self.records += 1
+        self.send()
+
+    def generation(self, generation, fps, alive=-1):
+        if self.generations == self.batch:
+            # throttled with a full batch: the newest record replaces the last
+            self.offset -= struct.calcsize(GENERATION)
+            self.records -= 1
+            self.generations -= 1
+        struct.pack_into(GENERATION, self.buffer, self.offset, TYPE_GENERATION, generation, fps, alive)
+        self.offset += struct.calcsize(GENERATION)
+        self.records += 1
+        self.generations += 1
+        if time.ticks_diff(time.ticks_ms(), self.last_send) >= self.interval:
+            self.send()
+
+    def steady_state(self, generation, cycle_index=-1, matched=-1, period=0):
+        struct.pack_into(STEADY, self.buffer, self.offset, TYPE_STEADY, generation, cycle_index, matched, period)
+        self.offset += struct.calcsize(STEADY)
+        self.records += 1
+        self.send()
+
+    def seed(self, kind, seed, chance, border, width, height):
+        struct.pack_into(SEED, self.buffer, self.offset, TYPE_SEED, seed, SOUPS.index(kind), chance, border, width, height)
+        self.offset += struct.calcsize(SEED)
+        self.records += 1
+        self.send()
+
+    def memory(self, generation, mean, high, collections):
+        struct.pack_into(MEMORY, self.buffer, self.offset, TYPE_MEMORY, generation, mean, high, collections)
+        self.offset += struct.calcsize(MEMORY)
+        self.records += 1
+        self.send()
+
+    def profile(self, generation, summary):
+        struct.pack_into(PROFILE, self.buffer, self.offset, TYPE_PROFILE, generation, len(PHASES))
+        self.offset += struct.calcsize(PROFILE)
+        for phase in PHASES:
+            low, mean, high = summary.get(phase, (0, 0, 0))
+            struct.pack_into(PHASE, self.buffer, self.offset, low, mean, high)
+            self.offset += struct.calcsize(PHASE)
+        self.records += 1
+        self.send()
+
+    ### Sending
+    def send(self):
+        if not self.records:
+            return
+        self.transmit(self.view, self.offset, self.records)
+        self.offset = struct.calcsize(HEADER)
+        self.records = 0
+        self.generations = 0
+        self.last_send = time.ticks_ms()
+
+    def transmit(self, view, length, records):
+        # send the first length bytes of a buffer's memoryview, which has room
+        # for the header at the start, as the next datagram in sequence
+        struct.pack_into(HEADER, view, 0, MAGIC, VERSION, records, self.sequence)
+        try:
+            self.socket.sendto(view[:length], self.address)
+        except OSError:
+            # non-blocking socket with a full buffer: drop it rather than wait
+            self.dropped += 1
+        self.sequence = (self.sequence + 1) & 0xffffffff
+
+
+class Stream:
+    # keeps a packed copy of the board, and of which cells have flipped since
+    # the last send, from flipped cells; sends them whenever Telemetry has
+    # sent generation records
+    def __init__(self, width, height, columns=COLUMNS, size=MAX_DATAGRAM):
+        self.width = width
+        self.height = height
+        self.stride = (height + 7) // 8
+        self.board = bytearray(width * self.stride)
+        # flips since the last send, by row rather than column, since the
+        # engines flip cells a row at a time
+        self.row_stride = (width + 7) // 8
+        self.flipped = bytearray(height * self.row_stride)
+        self.dirty = bytearray(height)
+        self.columns = columns
+        self.column = 0
+        self.keyframe = True
+        self.generation = 0
+        self.telemetry = None
+        self.last_send = None
+
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.begin()
+
+    def load(self, grid):
+        # a whole new board, indexed grid[x][y]; sent in full next time
+        board = self.board
+        stride = self.stride
+        for i in range(len(board)):
+            board[i] = 0
+        for x in range(self.width):
+            column = grid[x]
+            for y in range(self.height):
+                if column[y]:
+                    board[x*stride + (y >> 3)] |= 1 << (y & 7)
+        self.keyframe = True
+
+    def load_rows(self, rows):
+        # load, from BitGrid rows
+        board = self.board
+        stride = self.stride
+        for i in range(len(board)):
+            board[i] = 0
+        for y, row in enumerate(rows):
+            offset, bit = y >> 3, 1 << (y & 7)
+            x = 0
+            while row:
+                if not row & 0xff:
+                    row >>= 8
+                    x += 8
+                    continue
+                if row & 1:
+                    board[x*stride + offset] |= bit
+                row >>= 1
+                x += 1
+        self.keyframe = True
+
+    def flip(self, x, y):
+        self.board[x*self.stride + (y >> 3)] ^= 1 << (y & 7)
+        self.flipped[y*self.row_stride + (x >> 3)] ^= 1 << (x & 7)
+        self.dirty[y] = 1
+
+    def flip_row(self, y, diff):
+        # flip the cells of row y set in diff, a BitGrid row
+        start = y * self.row_stride
+        flipped = int.from_bytes(self.flipped[start:start + self.row_stride], 'little') ^ diff
+        self.flipped[start:start + self.row_stride] = flipped.to_bytes(self.row_stride, 'little')
+        self.dirty[y] = 1
+
+        board = self.board
+        stride = self.stride
+        offset, bit = y >> 3, 1 << (y & 7)
+        x = 0
+        while diff:
+            if not diff & 0xff:
+                diff >>= 8
+                x += 8
+                continue
+            if diff & 1:
+                board[x*stride + offset] ^= bit
+            diff >>= 1
+            x += 1
+
+    ### Building datagrams
+    def begin(self):
+        self.offset = struct.calcsize(HEADER)
+        self.records = 0
+        self.delta = None
+        self.runs = 0
+
+    def end_delta(self):
+        if self.delta is not None:
+            struct.pack_into(DELTA, self.buffer, self.delta, TYPE_DELTA, self.generation, self.runs)
+            self.delta = None
+            self.runs = 0
+
+    def transmit(self):
+        self.end_delta()
+        if self.records:
+            self.telemetry.transmit(self.view, self.offset, self.records)
+        self.begin()
+
+    def row_runs(self, y):
+        # (x, length) for each run of cells in row y flipped since the last
+        # send, at most 255 long
+        start = y * self.row_stride
+        row = int.from_bytes(self.flipped[start:start + self.row_stride], 'little')
+        x = 0
+        while row:
+            if not row & 0xff:
+                row >>= 8
+                x += 8
+                continue
+            if not row & 1:
+                row >>= 1
+                x += 1
+                continue
+            length = 0
+            while row & 1 and length < 255:
+                row >>= 1
+                length += 1
+            yield x, length
+            x += length
+
+    def clear_flips(self):
+        flipped = self.flipped
+        row_stride = self.row_stride
+        for y in range(self.height):
+            if self.dirty[y]:
+                self.dirty[y] = 0
+                for i in range(y*row_stride, (y + 1)*row_stride):
+                    flipped[i] = 0
+
+    def add_run(self, x, y, length):
+        needed = struct.calcsize(RUN) + (struct.calcsize(DELTA) if self.delta is None else 0)
+        if self.offset + needed > len(self.buffer):
+            self.transmit()
+        if self.delta is None:
+            self.delta = self.offset
+            self.offset += struct.calcsize(DELTA)
+            self.records += 1
+        struct.pack_into(RUN, self.buffer, self.offset, x, y, length)
+        self.offset += struct.calcsize(RUN)
+        self.runs += 1
+
+    def add_frames(self, count):
+        # the next count columns of the board, from where the last left off
+        stride = self.stride
+        while count:
+            fit = (len(self.buffer) - self.offset - struct.calcsize(FRAME)) // stride
+            if fit < 1:
+                self.transmit()
+                continue
+            columns = min(fit, count, self.width - self.column)
+            struct.pack_into(FRAME, self.buffer, self.offset, TYPE_FRAME, self.generation,
+                             self.width, self.height, self.column, columns)
+            self.offset += struct.calcsize(FRAME)
+            self.view[self.offset:self.offset + columns*stride] = self.board[self.column*stride:(self.column + columns)*stride]
+            self.offset += columns*stride
+            self.records += 1
+            count -= columns
+            self.column = (self.column + columns) % self.width
+
+    def send(self, generation):
+        # once each generation, but only sending after Telemetry has: the
+        # flips since last time as runs, then the next few columns; or the
+        # whole board, after load or when that's smaller than the runs
+        telemetry = self.telemetry
+        if telemetry is None or telemetry.last_send == self.last_send:
+            return
+        self.last_send = telemetry.last_send
+        self.generation = generation
+
+        dirty = self.dirty
+        if not self.keyframe:
+            runs = 0
+            for y in range(self.height):
+                if dirty[y]:
+                    for _ in self.row_runs(y):
+                        runs += 1
+            if runs * struct.calcsize(RUN) > self.width * self.stride:
+                self.keyframe = True
+
+        if self.keyframe:
+            self.keyframe = False
+            self.clear_flips()
+            self.add_frames(self.width)
+        else:
+            for y in range(self.height):
+                if dirty[y]:
+                    for x, length in self.row_runs(y):
+                        self.add_run(x, y, length)
+            self.end_delta()
+            self.clear_flips()
+            self.add_frames(min(self.columns, self.width))
+        self.transmit()
+
+
+def decode(data):
+    # (sequence, events) from a datagram, with events as dicts in the same
+    # form as the JSON ones; sequence is None for JSON datagrams
+    if data[:1] == b'{':
+        return None, [json.loads(data)]
+
+    try:
+        return decode_binary(data)
+    except (struct.error, IndexError):
+        raise ValueError(f"Truncated telemetry datagram ({len(data)} bytes)")
+
+
+def decode_binary(data):
+    magic, version, records, sequence = struct.unpack_from(HEADER, data)
+    if magic != MAGIC or version not in (1, VERSION):
+        raise ValueError(f"Unknown telemetry datagram (magic {magic}, version {version})")
+
+    events = []
+    offset = struct.calcsize(HEADER)
+    for _ in range(records):
+        kind = data[offset]
+        if kind == TYPE_START:
+            events.append({'event': 'start'})
+            offset += struct.calcsize(START)
+
+        elif kind == TYPE_GENERATION:
+            _, generation, fps, alive = struct.unpack_from(GENERATION, data, offset)
+            event = {'event': 'generation', 'generation': generation, 'fps': f"{fps:.2f}", 'fps_raw': fps}
+            if alive >= 0:
+                event['alive'] = alive
+            events.append(event)
+            offset += struct.calcsize(GENERATION)
+
+        elif kind == TYPE_STEADY:
+            _, generation, cycle_index, matched, period = struct.unpack_from(STEADY, data, offset)
+            event = {'event': 'steady_state', 'generation': generation}
+            if matched >= 0:
+                event['cycle_index'] = cycle_index
+                event['matched'] = matched
+                event['period'] = period
+            events.append(event)
+            offset += struct.calcsize(STEADY)
+
+        elif kind == TYPE_PROFILE:
+            _, generation, count = struct.unpack_from(PROFILE, data, offset)
+            offset += struct.calcsize(PROFILE)
+            phases = {}
+            for i in range(count):
+                name = PHASES[i] if i < len(PHASES) else f"phase{i}"
+                phases[name] = list(struct.unpack_from(PHASE, data, offset))
+                offset += struct.calcsize(PHASE)
+            events.append({'event': 'profile', 'generation': generation, 'phases': phases})
+
+        elif kind == TYPE_FRAME:
+            _, generation, width, height, column, columns = struct.unpack_from(FRAME, data, offset)
+            offset += struct.calcsize(FRAME)
+            length = columns * ((height + 7) // 8)
+            if offset + length > len(data):
+                raise IndexError
+            events.append({'event': 'frame', 'generation': generation, 'width': width, 'height': height,
+                           'column': column, 'columns': columns, 'cells': bytes(data[offset:offset + length])})
+            offset += length
+
+        elif kind == TYPE_DELTA:
+            _, generation, count = struct.unpack_from(DELTA, data, offset)
+            offset += struct.calcsize(DELTA)
+            runs = []
+            for _ in range(count):
+                runs.append(struct.unpack_from(RUN, data, offset))
+                offset += struct.calcsize(RUN)
+            events.append({'event': 'delta', 'generation': generation, 'runs': runs, 'vertical': version == 1})
+
+        elif kind == TYPE_SEED:
+            _, seed, soup, chance, border, width, height = struct.unpack_from(SEED, data, offset)
+            events.append({'event': 'seed', 'seed': seed, 'kind': SOUPS[soup], 'chance': round(chance, 4),
+                           'border': border, 'width': width, 'height': height})
+            offset += struct.calcsize(SEED)
+
+        elif kind == TYPE_MEMORY:
+            _, generation, mean, high, collections = struct.unpack_from(MEMORY, data, offset)
+            events.append({'event': 'memory', 'generation': generation, 'mean': mean, 'max': high,
+                           'collections': collections})
+            offset += struct.calcsize(MEMORY)
+
+        else:
+            raise ValueError(f"Unknown telemetry record type {kind}")
+
+    return sequence, events
+
+
+class Mirror:
+    # a listener's copy of the board, kept from frame and delta events
+    def __init__(self):
+        self.width = 0
+        self.height = 0
+        self.stride = 0
+        self.board = bytearray()
+        self.generation = None
+
+    def apply(self, event):
+        # returns True if the event changed the board
+        if event['event'] == 'frame':
+            if (event['width'], event['height']) != (self.width, self.height):
+                self.width = event['width']
+                self.height = event['height']
+                self.stride = (self.height + 7) // 8
+                self.board = bytearray(self.width * self.stride)
+            start = event['column'] * self.stride
+            self.board[start:start + len(event['cells'])] = event['cells']
+        elif event['event'] == 'delta' and self.board:
+            stride = self.stride
+            vertical = event.get('vertical')
+            for x, y, length in event['runs']:
+                for i in range(length):
+                    cx, cy = (x, y + i) if vertical else (x + i, y)
+                    if cx < self.width and cy < self.height:
+                        self.board[cx*stride + (cy >> 3)] ^= 1 << (cy & 7)
+        else:
+            return False
+        self.generation = event['generation']
+        return True
+
+    def cell(self, x, y):
+        return self.board[x*self.stride + (y >> 3)] >> (y & 7) & 1
@@ -0,0 +1,223 @@
+# Unbounded Life plane, in tiles allocated as activity reaches them
+#
+# The plane is a dict from tile coordinates (tx, ty) to TILE rows of TILE
+# cells each, packed as in BitGrid: bit i of row j is cell (tx*TILE + i,
+# ty*TILE + j). Only tiles with live cells are kept, so memory and time go
+# with the live area rather than the pattern's bounding box. Each generation
+# visits the live tiles and those next to a live edge; a tile is stepped as
+# rows TILE+2 bits wide, with one cell borrowed from each side, so the
+# neighbour counting is BitGrid's. TILE is 24 so those rows, shifted, still
+# fit MicroPython's small ints and step without allocating big ones.
+#
+# A step makes a new dict with new rows for the tiles that changed, and never
+# changes the old one, so a previous generation can be kept just by holding
+# on to it. Changes are only reported inside the window, the part of the
+# plane shown on the board, as whole rows of it, as BitGrid reports them.
+
+from life_bits import BitGrid
+
+TILE = 24
+
+
+class TileGrid:
+    def __init__(self, born=(3,), survive=(2, 3), window=(0, 0, 0, 0), margin=0):
+        # cells further than margin outside the window are dropped; 0 keeps
+        # everything, however far it goes
+        if 0 in born:
+            raise ValueError("B0 rules turn the whole plane on")
+        self.tiles = {}
+        self.counts = {}
+        self.count = 0
+        self.hash = 0
+        self.born = born
+        self.survive = survive
+        self.counter = BitGrid(TILE + 2, 0, born, survive)
+        self.empty = [0] * TILE
+        self.edges = [0] * (TILE + 2)
+        self.margin = margin
+        self.set_window(*window)
+
+    def set_window(self, left, top, width, height):
+        self.window = (left, top, width, height)
+        if self.margin:
+            margin = self.margin
+            self.bounds = ((left - margin) // TILE, (top - margin) // TILE,
+                           (left + width + margin - 1) // TILE, (top + height + margin - 1) // TILE)
+        else:
+            self.bounds = None
+
+    ### Loading and reading
+    def set_cells(self, x, y, length=1):
+        # set a run of length cells from (x, y), across tiles as needed
+        ty, j = divmod(y, TILE)
+        while length > 0:
+            tx, i = divmod(x, TILE)
+            count = min(length, TILE - i)
+            rows = self.tiles.get((tx, ty))
+            if rows is None:
+                rows = self.tiles[(tx, ty)] = [0] * TILE
+            rows[j] |= ((1 << count) - 1) << i
+            x += count
+            length -= count
+
+    def load_runs(self, runs, x_offset=0, y_offset=0):
+        # (x, y, length) live runs, as read from an RLE, with nothing clipped
+        for x, y, length in runs:
+            self.set_cells(x + x_offset, y + y_offset, length)
+        self.rehash()
+
+    def load(self, grid, width, height):
+        # grid is the list-of-lists form used by Life, indexed grid[x][y]
+        for x in range(width):
+            column = grid[x]
+            for y in range(height):
+                if column[y]:
+                    self.set_cells(x, y)
+        self.rehash()
+
+    def rehash(self):
+        # the hash and live cell counts, from scratch; step keeps them after
+        plane_hash = 0
+        counts = {}
+        for key, rows in self.tiles.items():
+            plane_hash ^= hash((key, tuple(rows)))
+            counts[key] = sum([bin(row).count('1') for row in rows])
+        self.hash = plane_hash
+        self.counts = counts
+        self.count = sum(counts.values())
+
+    def rows(self, left, top, width, height):
+        # the cells in a rectangle of the plane, as BitGrid rows
+        return [self.row(self.tiles, left, top + y, width) for y in range(height)]
+
+    def row(self, tiles, left, y, width):
+        # width cells of row y of a plane's tiles, from left, as a BitGrid row
+        ty, j = divmod(y, TILE)
+        row = 0
+        for tx in range(left // TILE, (left + width - 1) // TILE + 1):
+            rows = tiles.get((tx, ty))
+            if rows and rows[j]:
+                shift = tx*TILE - left
+                row |= rows[j] << shift if shift >= 0 else rows[j] >> -shift
+        return row & ((1 << width) - 1)
+
+    def population(self):
+        return self.count
+
+    ### Rule evaluation
+    def candidates(self):
+        # live tiles, and the tiles next to any of their live edges
+        found = set()
+        high_bit = 1 << (TILE - 1)
+        for key, rows in self.tiles.items():
+            tx, ty = key
+            found.add(key)
+            left = right = 0
+            for row in rows:
+                left |= row & 1
+                right |= row & high_bit
+            top, bottom = rows[0], rows[-1]
+            if top:
+                found.add((tx, ty - 1))
+                if top & 1:
+                    found.add((tx - 1, ty - 1))
+                if top & high_bit:
+                    found.add((tx + 1, ty - 1))
+            if bottom:
+                found.add((tx, ty + 1))
+                if bottom & 1:
+                    found.add((tx - 1, ty + 1))
+                if bottom & high_bit:
+                    found.add((tx + 1, ty + 1))
+            if left:
+                found.add((tx - 1, ty))
+            if right:
+                found.add((tx + 1, ty))
+        return found
+
+    def step(self):
+        # advance one generation; returns a list of (y, row, new_row) for
+        # each row of the window that changed, relative to its corner
+        tiles = self.tiles
+        get = tiles.get
+        counts = self.counts
+        empty = self.empty
+        edges = self.edges
+        next_row = self.counter.next_row
+        tile_mask = (1 << TILE) - 1
+        last = TILE - 1
+        left, top, width, height = self.window
+        bounds = self.bounds
+
+        new_tiles = {}
+        new_counts = {}
+        alive = 0
+        plane_hash = 0
+        changed = set()
+        for key in self.candidates():
+            tx, ty = key
+            if bounds and not (bounds[0] <= tx <= bounds[2] and bounds[1] <= ty <= bounds[3]):
+                continue
+            rows = get(key, empty)
+
+            # the tile's rows, a cell wider on each side, with the rows
+            # above and below it
+            west, east = get((tx - 1, ty), empty), get((tx + 1, ty), empty)
+            above = get((tx, ty - 1), empty)[last]
+            edges[0] = ((get((tx - 1, ty - 1), empty)[last] >> last) | above << 1
+                        | (get((tx + 1, ty - 1), empty)[last] & 1) << (TILE + 1))
+            for j in range(TILE):
+                edges[j + 1] = (west[j] >> last) | rows[j] << 1 | (east[j] & 1) << (TILE + 1)
+            below = get((tx, ty + 1), empty)[0]
+            edges[TILE + 1] = ((get((tx - 1, ty + 1), empty)[0] >> last) | below << 1
+                               | (get((tx + 1, ty + 1), empty)[0] & 1) << (TILE + 1))
+
+            new_rows = None
+            for j in range(TILE):
+                above, row, below = edges[j], edges[j + 1], edges[j + 2]
+                if not (above or row or below):
+                    continue
+                new_row = next_row(above, row, below) >> 1 & tile_mask
+                if new_row:
+                    if new_rows is None:
+                        new_rows = [0] * TILE
+                    new_rows[j] = new_row
+
+            if new_rows == rows:
+                # unchanged, so the old rows and count will do
+                new_rows = rows
+            if new_rows is rows:
+                count = counts.get(key, 0)
+            else:
+                # count only the rows that changed
+                new_rows = new_rows or empty
+                count = counts.get(key, 0)
+                for j in range(TILE):
+                    if rows[j] != new_rows[j]:
+                        count += bin(new_rows[j]).count('1') - bin(rows[j]).count('1')
+            if new_rows is not empty:
+                new_tiles[key] = new_rows
+                new_counts[key] = count
+                alive += count
+                plane_hash ^= hash((key, tuple(new_rows)))
+            if new_rows is rows:
+                continue
+
+            # window rows with changes
+            x0, y0 = tx*TILE - left, ty*TILE - top
+            low, high = max(-x0, 0), min(width - x0, TILE)
+            if low >= high:
+                continue
+            window_mask = ((1 << high) - 1) ^ ((1 << low) - 1)
+            for j in range(max(-y0, 0), min(height - y0, TILE)):
+                if (rows[j] ^ new_rows[j]) & window_mask:
+                    changed.add(y0 + j)
+
+        # the whole of each changed row, before and after
+        changes = [(y, self.row(tiles, left, top + y, width), self.row(new_tiles, left, top + y, width))
+                   for y in sorted(changed)]
+        self.tiles = new_tiles
+        self.counts = new_counts
+        self.count = alive
+        self.hash = plane_hash
+        return changes